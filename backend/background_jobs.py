@@ -0,0 +1,136 @@
+# backend/background_jobs.py
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+
+
+def _now():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+class Job:
+    """
+    Progress handle passed to a job function. Also usable on its own (never
+    submitted) so the same pipeline code can run synchronously.
+    """
+
+    def __init__(self, kind="inline", total_stages=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "queued"
+        self.submitted_at = _now()
+        self.started_at = None
+        self.finished_at = None
+        self.total_stages = total_stages
+        self.current_stage = None
+        self.stage_seconds = {}
+        self.progress_detail = None
+        self.result = None
+        self.error = None
+
+    @contextmanager
+    def stage(self, name):
+        """Time a named stage of the job"""
+        self.current_stage = name
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_seconds[name] = round(time.perf_counter() - start, 3)
+
+    def set_progress(self, detail):
+        """Free-form progress within the current stage, e.g. {"done": 10, "total": 50}"""
+        self.progress_detail = detail
+
+    def to_dict(self):
+        completed = len(self.stage_seconds)
+        percent = None
+        if self.status == "completed":
+            percent = 100
+        elif self.total_stages:
+            percent = int(100 * completed / self.total_stages)
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": {
+                "stage": self.current_stage,
+                "completed_stages": completed,
+                "total_stages": self.total_stages,
+                "percent": percent,
+                "detail": self.progress_detail,
+            },
+            "stage_seconds": dict(self.stage_seconds),
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """
+    Runs jobs on a small thread pool and keeps their status in memory.
+
+    Submissions with the same coalesce_key while a job is queued or running
+    return that job instead of starting a duplicate.
+    """
+
+    def __init__(self, kind, max_workers=1, keep_finished=50):
+        self.kind = kind
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{kind}-job")
+        self._jobs = OrderedDict()
+        self._active = {}
+        self._keep_finished = keep_finished
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, coalesce_key=None, total_stages=None, **kwargs):
+        """
+        Schedule fn(job, *args, **kwargs). Returns (job, created); created is
+        False when the submission coalesced onto an active job.
+        """
+        with self._lock:
+            if coalesce_key is not None and coalesce_key in self._active:
+                return self._active[coalesce_key], False
+
+            job = Job(self.kind, total_stages)
+            self._jobs[job.id] = job
+            if coalesce_key is not None:
+                self._active[coalesce_key] = job
+            self._prune()
+
+        self._executor.submit(self._run, job, coalesce_key, fn, args, kwargs)
+        return job, True
+
+    def _run(self, job, coalesce_key, fn, args, kwargs):
+        job.status = "running"
+        job.started_at = _now()
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.status = "completed"
+        except Exception as e:
+            print(f"{self.kind} job {job.id} failed: {e}")
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = _now()
+            job.current_stage = None
+            with self._lock:
+                if coalesce_key is not None and self._active.get(coalesce_key) is job:
+                    del self._active[coalesce_key]
+
+    def _prune(self):
+        finished = [jid for jid, job in self._jobs.items() if job.status in ("completed", "failed")]
+        for jid in finished[:max(0, len(finished) - self._keep_finished)]:
+            del self._jobs[jid]
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def active(self, coalesce_key):
+        return self._active.get(coalesce_key)
@@ -0,0 +1,229 @@
+# backend/batch_score.py - Score the fleet outside the API process
+#
+#   python batch_score.py                  # full re-score (nightly cron)
+#   python batch_score.py --mode incremental
+#   python batch_score.py --db /path/to/hospital_equipment_system.db --keep-snapshot snap.db
+#
+# Scoring runs against a private snapshot of the database, so the live file is only
+# locked for the snapshot copy and for the final swap transaction.
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+from background_jobs import Job
+from database import get_db
+from predict import ensure_prediction_schema, prediction_models, score_fleet, load_skip_set
+
+BATCH_STAGES = ("snapshot", "load_windows", "inference", "stage", "swap")
+
+
+def ensure_staging_schema(cursor):
+    """
+    Scored rows wait here until the swap; `status` records what the swap did with each
+    """
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS failure_predictions_staging (
+        run_id TEXT,
+        equipment_id TEXT,
+        needs_maintenance_10_days INTEGER,
+        failure_probability REAL,
+        last_usage_rowid INTEGER,
+        last_usage_timestamp TEXT,
+        window_rowids TEXT,
+        engine TEXT,
+        status TEXT DEFAULT 'staged',
+        PRIMARY KEY (run_id, equipment_id)
+    )
+    """)
+
+
+def open_live_db(db_path=None):
+    return sqlite3.connect(db_path) if db_path else get_db()
+
+
+def take_snapshot(live_conn, snapshot_path):
+    """Consistent copy of the live database via SQLite's online backup API"""
+    snapshot = sqlite3.connect(snapshot_path)
+    live_conn.backup(snapshot)
+    return snapshot
+
+
+def stage_scores(live_conn, run_id, scored, signatures, engine):
+    """Write scored rows to the staging table in their own short transaction"""
+    rows = [
+        (run_id, eid, int(pred), float(round(prob, 4)), *signatures[eid], engine)
+        for eid, (pred, prob) in scored.items()
+    ]
+    live_conn.executemany("""
+        INSERT INTO failure_predictions_staging (
+            run_id, equipment_id, needs_maintenance_10_days, failure_probability,
+            last_usage_rowid, last_usage_timestamp, window_rowids, engine
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+    live_conn.commit()
+    return len(rows)
+
+
+def swap_in(live_conn, run_id):
+    """
+    Apply a staged run to failure_predictions in one transaction. The skip rules are
+    re-checked against the live data, and rows the API re-scored on newer usage since
+    the snapshot are left alone. Returns counts per outcome.
+    """
+    cursor = live_conn.cursor()
+    today = datetime.now().strftime('%Y-%m-%d')
+    scored_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        skip_set = load_skip_set(cursor)
+        cursor.executemany("""
+            UPDATE failure_predictions_staging SET status = 'preserved_post_maintenance'
+            WHERE run_id = ? AND equipment_id = ?
+        """, [(run_id, eid) for eid in skip_set])
+        cursor.execute("""
+            UPDATE failure_predictions_staging SET status = 'superseded'
+            WHERE run_id = ? AND status = 'staged'
+            AND EXISTS (
+                SELECT 1 FROM prediction_watermarks w
+                WHERE w.equipment_id = failure_predictions_staging.equipment_id
+                AND w.last_usage_rowid > failure_predictions_staging.last_usage_rowid
+            )
+        """, (run_id,))
+
+        # WHERE is required before ON CONFLICT in INSERT ... SELECT
+        cursor.execute("""
+            INSERT INTO failure_predictions (equipment_id, prediction_date, needs_maintenance_10_days, failure_probability)
+            SELECT equipment_id, ?, needs_maintenance_10_days, failure_probability
+            FROM failure_predictions_staging
+            WHERE run_id = ? AND status = 'staged'
+            ON CONFLICT(equipment_id) DO UPDATE SET
+                prediction_date = excluded.prediction_date,
+                needs_maintenance_10_days = excluded.needs_maintenance_10_days,
+                failure_probability = excluded.failure_probability
+        """, (today, run_id))
+        cursor.execute("""
+            INSERT INTO prediction_watermarks (
+                equipment_id, last_usage_rowid, last_usage_timestamp, window_rowids,
+                engine, needs_maintenance_10_days, failure_probability, scored_at
+            )
+            SELECT equipment_id, last_usage_rowid, last_usage_timestamp, window_rowids,
+                   engine, needs_maintenance_10_days, failure_probability, ?
+            FROM failure_predictions_staging
+            WHERE run_id = ? AND status = 'staged'
+            ON CONFLICT(equipment_id) DO UPDATE SET
+                last_usage_rowid = excluded.last_usage_rowid,
+                last_usage_timestamp = excluded.last_usage_timestamp,
+                window_rowids = excluded.window_rowids,
+                engine = excluded.engine,
+                needs_maintenance_10_days = excluded.needs_maintenance_10_days,
+                failure_probability = excluded.failure_probability,
+                scored_at = excluded.scored_at
+        """, (scored_at, run_id))
+
+        cursor.execute("""
+            SELECT status, COUNT(*) FROM failure_predictions_staging
+            WHERE run_id = ? GROUP BY status
+        """, (run_id,))
+        counts = dict(cursor.fetchall())
+        cursor.execute("DELETE FROM failure_predictions_staging WHERE run_id = ?", (run_id,))
+        live_conn.commit()
+    except Exception:
+        live_conn.rollback()
+        raise
+
+    return {
+        "updated": counts.get("staged", 0),
+        "preserved_post_maintenance": counts.get("preserved_post_maintenance", 0),
+        "superseded": counts.get("superseded", 0),
+    }
+
+
+def run_batch(mode="full", db_path=None, snapshot_path=None):
+    job = Job("batch_score", len(BATCH_STAGES))
+    run_id = uuid.uuid4().hex
+    keep_snapshot = snapshot_path is not None
+    if snapshot_path is None:
+        fd, snapshot_path = tempfile.mkstemp(prefix="batch_score_", suffix=".db")
+        os.close(fd)
+
+    # Load every model before scoring instead of falling back after MODEL_WAIT_SECONDS
+    prediction_models.start()
+    prediction_models.wait(timeout=None)
+
+    live = open_live_db(db_path)
+    snapshot = None
+    try:
+        with job.stage("snapshot"):
+            cursor = live.cursor()
+            # Indexes and tables land in the live file first so the snapshot has them too
+            ensure_prediction_schema(cursor)
+            ensure_staging_schema(cursor)
+            live.commit()
+            snapshot = take_snapshot(live, snapshot_path)
+
+        equipment_map, signatures, engine, scored, prediction_method = score_fleet(snapshot, mode, job)
+        if not equipment_map:
+            return {"message": "Not enough data for any equipment."}
+
+        with job.stage("stage"):
+            staged = stage_scores(live, run_id, scored, signatures, engine)
+
+        with job.stage("swap"):
+            outcome = swap_in(live, run_id) if staged else {
+                "updated": 0, "preserved_post_maintenance": 0, "superseded": 0
+            }
+    finally:
+        # Rows of a run that failed before its swap would otherwise linger
+        try:
+            live.execute("DELETE FROM failure_predictions_staging WHERE run_id = ?", (run_id,))
+            live.commit()
+        except sqlite3.Error as e:
+            print(f"Warning: could not clear staged rows for run {run_id}: {e}")
+        live.close()
+        if snapshot is not None:
+            snapshot.close()
+        if not keep_snapshot and os.path.exists(snapshot_path):
+            os.remove(snapshot_path)
+
+    return {
+        "run_id": run_id,
+        "mode": mode,
+        "prediction_method": prediction_method,
+        "summary": {
+            "total_equipment": len(equipment_map),
+            "rescored": len(scored),
+            "skipped_unchanged": len(equipment_map) - len(scored),
+            **outcome,
+        },
+        "stage_seconds": job.stage_seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score all equipment against a snapshot and swap the results in atomically")
+    parser.add_argument("--mode", choices=["full", "incremental"], default="full",
+                        help="'incremental' only re-scores equipment whose usage window changed")
+    parser.add_argument("--db", help="Live database path (default: same lookup as the API)")
+    parser.add_argument("--keep-snapshot", metavar="PATH", help="Write the snapshot here and keep it")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        result = run_batch(args.mode, args.db, args.keep_snapshot)
+    except Exception as e:
+        print(f"ERROR: batch scoring failed: {e}")
+        sys.exit(1)
+    result["total_seconds"] = round(time.perf_counter() - start, 3)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
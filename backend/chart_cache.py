@@ -0,0 +1,122 @@
+# backend/chart_cache.py
+import glob
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+CHARTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "charts")
+# Total size of cached chart files before the least recently used ones are deleted
+CHART_CACHE_MAX_MB = float(os.getenv("CHART_CACHE_MAX_MB", "200"))
+
+
+class ChartCache:
+    """
+    Rendered charts on disk, one file per (equipment, data version, render settings).
+
+    The file name embeds a hash of the key, so a file that exists is a hit and is
+    served as is. Hits refresh the file's mtime; when the cache grows past
+    max_bytes the files with the oldest mtime are deleted first.
+    """
+
+    def __init__(self, prefix, directory=CHARTS_DIR, max_bytes=int(CHART_CACHE_MAX_MB * 1024 * 1024)):
+        self.prefix = prefix
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, equipment_id, *key_parts):
+        digest = hashlib.sha1(json.dumps([equipment_id, *key_parts], default=str).encode()).hexdigest()[:16]
+        return os.path.join(self.directory, f"{self.prefix}-{equipment_id}-{digest}.png")
+
+    @contextmanager
+    def lock(self, path):
+        """Serialise renders of the same chart so concurrent misses draw it once"""
+        with self._locks_guard:
+            lock = self._locks.setdefault(path, threading.Lock())
+        with lock:
+            yield
+
+    def lookup(self, path):
+        """True (and the entry marked as recently used) if the chart is cached"""
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return False
+        self.hits += 1
+        return True
+
+    def read(self, path):
+        """The cached PNG bytes (entry marked as recently used), or None on a miss"""
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass  # evicted meanwhile; the bytes are still valid
+        self.hits += 1
+        return data
+
+    def put(self, path, data):
+        """
+        Store PNG bytes at `path`. Written to a temporary file first, so readers
+        never see a partial PNG.
+        """
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.evict()
+
+    def _entries(self):
+        entries = []
+        for path in glob.glob(os.path.join(self.directory, f"{self.prefix}-*.png")):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def evict(self):
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                self.evictions += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def stats(self):
+        entries = self._entries()
+        return {
+            "files": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+trend_chart_cache = ChartCache("trend")
+eda_chart_cache = ChartCache("eda")
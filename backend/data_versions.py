@@ -0,0 +1,70 @@
+# backend/data_versions.py
+import hashlib
+import random
+
+# One counter per watched table, bumped by triggers whenever a row is inserted, deleted
+# or has a watched column changed. The "_epoch" row is random per database, so a
+# restored or replaced file doesn't reuse another file's counters. Watchers that
+# register different columns for a table each get their own update trigger, all
+# bumping the table's one counter, so it moves for a change to any of them.
+_ready = set()  # (database file, table, watched columns)
+
+
+def _database_file(cursor):
+    cursor.execute("PRAGMA database_list")
+    return next(row[2] for row in cursor.fetchall() if row[1] == "main")
+
+
+def _bump(table):
+    return f"UPDATE data_versions SET version = version + 1 WHERE table_name = '{table}';"
+
+
+def _columns_key(columns):
+    """Trigger name suffix for a watched column set (None = every column)"""
+    if columns is None:
+        return "all"
+    return hashlib.sha1(",".join(sorted(columns)).encode()).hexdigest()[:8]
+
+
+def ensure_data_versions(cursor, watched):
+    """
+    Create the counters and triggers for `watched` ({table: [columns] or None for all
+    columns}). Tables that don't exist yet are skipped and retried on the next call.
+    """
+    database = _database_file(cursor)
+    pending = [table for table in watched if (database, table, _columns_key(watched[table])) not in _ready]
+    if not pending:
+        return
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS data_versions (
+        table_name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+    cursor.execute("INSERT OR IGNORE INTO data_versions (table_name, version) VALUES ('_epoch', ?)",
+                   (random.getrandbits(62),))
+    for table in pending:
+        cursor.execute(f"PRAGMA table_info({table})")
+        all_columns = [row[1] for row in cursor.fetchall()]
+        if not all_columns:
+            continue
+        key = _columns_key(watched[table])
+        columns = watched[table] or all_columns
+        changed = " OR ".join(f"OLD.{col} IS NOT NEW.{col}" for col in columns)
+        cursor.execute("INSERT OR IGNORE INTO data_versions (table_name) VALUES (?)", (table,))
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_data_version_{table}_insert AFTER INSERT ON {table} BEGIN {_bump(table)} END")
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_data_version_{table}_delete AFTER DELETE ON {table} BEGIN {_bump(table)} END")
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_data_version_{table}_update_{key} AFTER UPDATE ON {table} WHEN {changed} BEGIN {_bump(table)} END")
+        _ready.add((database, table, key))
+    cursor.connection.commit()
+
+
+def read_data_versions(cursor, watched):
+    """{table: version} for the watched tables plus "_epoch"; None for a missing table"""
+    ensure_data_versions(cursor, watched)
+    cursor.execute(
+        f"SELECT table_name, version FROM data_versions WHERE table_name IN ({','.join('?' * (len(watched) + 1))})",
+        ("_epoch", *watched),
+    )
+    versions = dict(cursor.fetchall())
+    return {table: versions.get(table) for table in ("_epoch", *watched)}
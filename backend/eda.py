@@ -1,16 +1,42 @@
 # backend/eda.py
+import asyncio
 import base64
 from fastapi import APIRouter, Response
-from generate_eda_image import generate_eda_image
-import os
+from chart_cache import eda_chart_cache
+from data_versions import read_data_versions
+from database import get_db
+from generate_eda_image import EDA_SOURCES, EDA_RENDER_SETTINGS
+from render_pool import render_pool, RenderUnavailable
 
 router = APIRouter()
 
+def _eda_cache_path():
+    """Cache file for the dashboard as of the current data versions of its source tables"""
+    conn = get_db()
+    try:
+        versions = read_data_versions(conn.cursor(), EDA_SOURCES)
+    finally:
+        conn.close()
+    return eda_chart_cache.path_for("overall", versions, EDA_RENDER_SETTINGS)
+
+def _read_cached(path):
+    png = eda_chart_cache.read(path)
+    return base64.b64encode(png).decode("utf-8") if png else None
+
+def _store(path, png):
+    eda_chart_cache.put(path, png)
+    return base64.b64encode(png).decode("utf-8")
+
 @router.get("/eda/overall-eda-image")
 async def get_eda_image():
-    path = generate_eda_image()
-    if os.path.exists(path):
-        with open(path, "rb") as img_file:
-            encoded_string = base64.b64encode(img_file.read()).decode("utf-8")
-            return {"image_base64": encoded_string}
-    return Response(content="EDA image not found", status_code=404)
+    # Database and file work runs in threads and drawing in a render worker, so the
+    # event loop only awaits; concurrent misses for the same data share one render
+    path = await asyncio.to_thread(_eda_cache_path)
+    encoded_string = await asyncio.to_thread(_read_cached, path)
+    if encoded_string is None:
+        try:
+            png = await render_pool.render_async(path, "generate_eda_image:render_eda_png")
+        except RenderUnavailable as e:
+            return Response(content=f"EDA image unavailable: {e}", status_code=503, headers={"Retry-After": "5"})
+        encoded_string = await asyncio.to_thread(_store, path, png)
+    return {"image_base64": encoded_string}
@@ -0,0 +1,140 @@
+# backend/equipment_stats.py - Per-equipment maintenance aggregates kept current by triggers
+#
+#   python equipment_stats.py            # rebuild the table from maintenance_logs
+#   python equipment_stats.py --check    # report rows that drifted from a fresh aggregate
+
+import argparse
+import sys
+
+from database import get_db
+
+# Aggregates straight from the log history; used by the rebuild and the drift check
+AGGREGATE_QUERY = """
+    SELECT equipment_id,
+           COALESCE(SUM(downtime_hours), 0),
+           COUNT(maintenance_id),
+           COALESCE(SUM(response_time_hours), 0),
+           COUNT(response_time_hours)
+    FROM maintenance_logs
+    GROUP BY equipment_id
+"""
+
+
+def _add(row, sign):
+    """Trigger statement adding (sign=+1) or removing (sign=-1) one log row's contribution"""
+    return f"""
+        INSERT INTO equipment_stats (equipment_id, downtime_sum, log_count, response_sum, response_count)
+        VALUES (
+            {row}.equipment_id,
+            {sign} * COALESCE({row}.downtime_hours, 0),
+            {sign} * ({row}.maintenance_id IS NOT NULL),
+            {sign} * COALESCE({row}.response_time_hours, 0),
+            {sign} * ({row}.response_time_hours IS NOT NULL)
+        )
+        ON CONFLICT(equipment_id) DO UPDATE SET
+            downtime_sum = downtime_sum + excluded.downtime_sum,
+            log_count = log_count + excluded.log_count,
+            response_sum = response_sum + excluded.response_sum,
+            response_count = response_count + excluded.response_count;
+    """
+
+
+TRIGGERS = {
+    "trg_equipment_stats_insert": ("AFTER INSERT ON maintenance_logs", _add("NEW", 1)),
+    "trg_equipment_stats_delete": ("AFTER DELETE ON maintenance_logs", _add("OLD", -1)),
+    "trg_equipment_stats_update": (
+        "AFTER UPDATE OF equipment_id, maintenance_id, downtime_hours, response_time_hours ON maintenance_logs",
+        _add("OLD", -1) + _add("NEW", 1),
+    ),
+}
+
+_ready_databases = set()
+
+
+def _database_file(cursor):
+    cursor.execute("PRAGMA database_list")
+    return next(row[2] for row in cursor.fetchall() if row[1] == "main")
+
+
+def rebuild_equipment_stats(cursor):
+    """Recompute every row from maintenance_logs; returns the number of equipment rows"""
+    cursor.execute("DELETE FROM equipment_stats")
+    cursor.execute(f"""
+        INSERT INTO equipment_stats (equipment_id, downtime_sum, log_count, response_sum, response_count)
+        {AGGREGATE_QUERY}
+    """)
+    cursor.execute("SELECT COUNT(*) FROM equipment_stats")
+    return cursor.fetchone()[0]
+
+
+def ensure_equipment_stats(cursor):
+    """
+    Create equipment_stats and its maintenance_logs triggers, filling the table on first
+    use. Runs once per process and database file.
+    """
+    database = _database_file(cursor)
+    if database in _ready_databases:
+        return
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'equipment_stats'")
+    created = cursor.fetchone() is None
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS equipment_stats (
+        equipment_id TEXT PRIMARY KEY,
+        downtime_sum REAL NOT NULL DEFAULT 0,
+        log_count INTEGER NOT NULL DEFAULT 0,
+        response_sum REAL NOT NULL DEFAULT 0,
+        response_count INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+    for name, (event, body) in TRIGGERS.items():
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body} END")
+    if created:
+        rebuild_equipment_stats(cursor)
+    cursor.connection.commit()
+    _ready_databases.add(database)
+
+
+def find_drift(cursor, tolerance=1e-6):
+    """Equipment whose stored aggregates differ from a fresh aggregate over maintenance_logs"""
+    cursor.execute("""
+        SELECT equipment_id, downtime_sum, log_count, response_sum, response_count
+        FROM equipment_stats
+    """)
+    stored = {row[0]: row[1:] for row in cursor.fetchall()}
+    cursor.execute(AGGREGATE_QUERY)
+    expected = {row[0]: row[1:] for row in cursor.fetchall()}
+
+    empty = (0, 0, 0, 0)
+    drifted = []
+    for eid in sorted(stored.keys() | expected.keys()):
+        have, want = stored.get(eid, empty), expected.get(eid, empty)
+        if any(abs((a or 0) - (b or 0)) > tolerance for a, b in zip(have, want)):
+            drifted.append({"equipment_id": eid, "stored": have, "expected": want})
+    return drifted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild or verify the equipment_stats aggregate table")
+    parser.add_argument("--check", action="store_true", help="Only report drift, don't rebuild")
+    args = parser.parse_args()
+
+    conn = get_db()
+    try:
+        cursor = conn.cursor()
+        ensure_equipment_stats(cursor)
+        if args.check:
+            drifted = find_drift(cursor)
+            for row in drifted:
+                print(f"DRIFT: {row['equipment_id']} stored={row['stored']} expected={row['expected']}")
+            print(f"{len(drifted)} equipment with drifted stats")
+            sys.exit(1 if drifted else 0)
+
+        count = rebuild_equipment_stats(cursor)
+        conn.commit()
+        print(f"SUCCESS: rebuilt equipment_stats for {count} equipment")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
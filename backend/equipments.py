@@ -3,7 +3,6 @@ from fastapi import APIRouter, HTTPException, Depends, Query
 from fastapi.responses import JSONResponse
 from typing import Optional
 from pydantic import BaseModel
-import matplotlib.pyplot as plt
 import sqlite3, io, base64, os
 import pandas as pd
 from database import get_db
@@ -53,7 +52,7 @@ def list_equipments(
 # Get Equipment Details + Trend Chart
 @router.get("/{equipment_id}")
 def get_equipment(equipment_id: str, user=Depends(get_current_user)):
-    from generate_equipment_report import fetch_equipment_metrics
+    from generate_equipment_report import fetch_equipment_metrics_with_chart
 
     conn = get_db()
     cursor = conn.cursor()
@@ -73,13 +72,11 @@ def get_equipment(equipment_id: str, user=Depends(get_current_user)):
 
     # Generate trend graph
     try:
-        metrics = fetch_equipment_metrics(equipment_id)
-        chart_path = metrics.get("chart_path")
+        metrics, png = fetch_equipment_metrics_with_chart(equipment_id)
         img_data = ""
-        if chart_path and os.path.exists(chart_path):
-            with open(chart_path, "rb") as f:
-                encoded = base64.b64encode(f.read()).decode('utf-8')
-                img_data = f"data:image/png;base64,{encoded}"
+        if png:
+            encoded = base64.b64encode(png).decode('utf-8')
+            img_data = f"data:image/png;base64,{encoded}"
         return {
             "equipment": row,
             "trend_plot": img_data
@@ -90,6 +87,68 @@ def get_equipment(equipment_id: str, user=Depends(get_current_user)):
             "trend_plot": None
         }
 
+USAGE_SERIES = ["usage_hours", "avg_cpu_temp", "workload_level", "error_count"]
+
+# Daily usage aggregates as JSON, downsampled to at most `resolution` points per series
+@router.get("/{equipment_id}/usage-series")
+def get_usage_series(
+    equipment_id: str,
+    from_date: Optional[str] = Query(None, alias="from", description="First day, YYYY-MM-DD"),
+    to_date: Optional[str] = Query(None, alias="to", description="Last day, YYYY-MM-DD"),
+    resolution: int = Query(200, ge=3, le=2000, description="Maximum points per series"),
+    user=Depends(get_current_user)
+):
+    from usage_rollups import read_usage_daily
+    from downsample import lttb_indices
+
+    try:
+        start = pd.Timestamp(from_date).normalize() if from_date else None
+        end = pd.Timestamp(to_date).normalize() if to_date else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="'from' and 'to' must be dates (YYYY-MM-DD)")
+    if start is not None and end is not None and start > end:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Technician can access only "Scheduled" equipment
+    if user["role"] == "technician":
+        cursor.execute("SELECT COUNT(*) FROM maintenance_logs WHERE equipment_id = ? AND status = 'Scheduled'", (equipment_id,))
+        if cursor.fetchone()[0] == 0:
+            conn.close()
+            raise HTTPException(status_code=403, detail="Not authorized for this equipment")
+
+    cursor.execute("SELECT 1 FROM equipment WHERE equipment_id = ?", (equipment_id,))
+    if cursor.fetchone() is None:
+        conn.close()
+        raise HTTPException(status_code=404, detail="Equipment not found")
+
+    daily = read_usage_daily(
+        conn, equipment_id,
+        start.strftime('%Y-%m-%d') if start is not None else None,
+        end.strftime('%Y-%m-%d') if end is not None else None,
+    )
+    conn.close()
+
+    days = len(daily)
+    series = {}
+    x = daily["date"].values.astype("datetime64[D]").astype(float)
+    dates = daily["date"].dt.strftime('%Y-%m-%d').tolist()
+    for name in USAGE_SERIES:
+        y = daily[name].to_numpy(dtype=float)
+        series[name] = [[dates[i], round(float(y[i]), 3)] for i in lttb_indices(x, y, resolution)]
+
+    return {
+        "equipment_id": equipment_id,
+        "from": from_date,
+        "to": to_date,
+        "days": days,
+        "resolution": resolution,
+        "downsampled": days > resolution,
+        "series": series,
+    }
+
 # Add Equipment (admin only)
 @router.post("/", dependencies=[Depends(require_role("admin"))])
 def add_equipment(data: EquipmentIn):
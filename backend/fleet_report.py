@@ -0,0 +1,292 @@
+# backend/fleet_report.py - Report bundle for every equipment in the fleet
+#
+#   python fleet_report.py                         # HTML index under reports/fleet-<timestamp>/
+#   python fleet_report.py --pdf --workers 4
+#   python fleet_report.py --db /path/to/hospital_equipment_system.db --out /tmp/audit
+#
+# Each equipment gets <out>/<equipment_id>/trend.png and report.json (metrics, priority
+# labels, recent maintenance); index.html (and fleet_report.pdf with --pdf) combines them.
+# Everything is read from one snapshot of the database, and reports are built in parallel
+# worker processes.
+
+import argparse
+import html
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import pandas as pd
+
+from background_jobs import Job
+from batch_score import open_live_db, take_snapshot
+from equipment_stats import ensure_equipment_stats
+from usage_rollups import ensure_usage_rollups
+
+REPORTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reports")
+FLEET_REPORT_WORKERS = int(os.getenv("FLEET_REPORT_WORKERS", str(min(4, os.cpu_count() or 1))))
+RECENT_MAINTENANCE_LIMIT = 10
+# Longest side of a chart embedded in the PDF
+PDF_CHART_PIXELS = 1400
+
+REPORT_STAGES = ("snapshot", "priorities", "reports", "index")
+
+# Per-worker state set up once by _init_worker
+_worker = {}
+
+
+def _init_worker(snapshot_path, out_dir, min_date, max_date):
+    """Runs once in each worker process: one snapshot connection reused for every report"""
+    _worker.update(
+        conn=sqlite3.connect(snapshot_path),
+        out_dir=out_dir,
+        min_date=min_date,
+        max_date=max_date,
+    )
+
+
+def _build_report(equipment_id, priority):
+    """Write one equipment's bundle; returns its summary for the index"""
+    from generate_equipment_report import equipment_metrics, render_trend_chart_png
+
+    start = time.perf_counter()
+    conn = _worker["conn"]
+    bundle_dir = os.path.join(_worker["out_dir"], equipment_id)
+    os.makedirs(bundle_dir, exist_ok=True)
+    try:
+        metrics, daily_usage = equipment_metrics(conn, equipment_id)
+        png = render_trend_chart_png(equipment_id, daily_usage, _worker["min_date"], _worker["max_date"])
+        with open(os.path.join(bundle_dir, "trend.png"), "wb") as f:
+            f.write(png)
+        metrics["chart_path"] = f"{equipment_id}/trend.png"
+
+        recent = pd.read_sql("""
+            SELECT maintenance_id, date, maintenance_type, status, downtime_hours, issue_description
+            FROM maintenance_logs
+            WHERE equipment_id = ?
+            ORDER BY date DESC
+            LIMIT ?
+        """, conn, params=(equipment_id, RECENT_MAINTENANCE_LIMIT))
+        report = {
+            "equipment_id": equipment_id,
+            "metrics": metrics,
+            "priority": priority,
+            "recent_maintenance": json.loads(recent.to_json(orient="records")),
+        }
+        with open(os.path.join(bundle_dir, "report.json"), "w") as f:
+            json.dump(report, f, indent=2, default=str)
+    except Exception as e:
+        return {"equipment_id": equipment_id, "error": str(e), "seconds": round(time.perf_counter() - start, 3)}
+
+    report["seconds"] = round(time.perf_counter() - start, 3)
+    return report
+
+
+def _cell(value):
+    return html.escape("" if value is None else str(value))
+
+
+def write_html_index(out_dir, equipment, reports, generated_at):
+    """index.html: a summary table, then one section per equipment with its chart"""
+    rows, sections = [], []
+    for eid, info in equipment.items():
+        report = reports.get(eid, {"error": "not generated"})
+        if "error" in report:
+            rows.append(f"<tr><td>{_cell(eid)}</td><td>{_cell(info['type'])}</td><td>{_cell(info['location'])}</td>"
+                        f"<td colspan='5' class='error'>{_cell(report['error'])}</td></tr>")
+            continue
+        metrics = report["metrics"]
+        needs = (report["priority"] or {}).get("maintenance_needs", {})
+        rows.append(
+            f"<tr><td><a href='#{_cell(eid)}'>{_cell(eid)}</a></td><td>{_cell(info['type'])}</td>"
+            f"<td>{_cell(info['location'])}</td><td>{_cell(info['criticality'])}</td>"
+            f"<td>{_cell(metrics['risk_score'])}</td><td>{_cell(needs.get('preventive'))}</td>"
+            f"<td>{_cell(needs.get('corrective'))}</td><td>{_cell(needs.get('replacement'))}</td></tr>"
+        )
+        maintenance = "".join(
+            f"<tr><td>{_cell(m['date'])}</td><td>{_cell(m['maintenance_type'])}</td><td>{_cell(m['status'])}</td>"
+            f"<td>{_cell(m['downtime_hours'])}</td><td>{_cell(m['issue_description'])}</td></tr>"
+            for m in report["recent_maintenance"]
+        ) or "<tr><td colspan='5'>No maintenance recorded</td></tr>"
+        sections.append(f"""
+<section id="{_cell(eid)}">
+  <h2>{_cell(eid)} &mdash; {_cell(info['type'])}, {_cell(info['location'])}</h2>
+  <p>Age {_cell(metrics['equipment_age'])} years &middot; downtime {_cell(metrics['downtime_hours'])} h &middot;
+     {_cell(metrics['num_failures'])} maintenance events &middot; avg response {_cell(round(metrics['response_time_hours'], 2))} h &middot;
+     risk score {_cell(metrics['risk_score'])}</p>
+  <img src="{_cell(metrics['chart_path'])}" alt="Usage trend for {_cell(eid)}" width="700">
+  <table><tr><th>Date</th><th>Type</th><th>Status</th><th>Downtime (h)</th><th>Issue</th></tr>{maintenance}</table>
+</section>""")
+
+    document = f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Fleet equipment report {_cell(generated_at)}</title>
+<style>
+body {{ font-family: sans-serif; margin: 2em; color: #1f2937; }}
+table {{ border-collapse: collapse; margin: 1em 0; }}
+td, th {{ border: 1px solid #e5e7eb; padding: 4px 8px; text-align: left; }}
+.error {{ color: #b91c1c; }}
+section {{ page-break-before: always; }}
+</style></head><body>
+<h1>Fleet equipment report</h1>
+<p>Generated {_cell(generated_at)} &middot; {len(equipment)} equipment</p>
+<table><tr><th>Equipment</th><th>Type</th><th>Location</th><th>Criticality</th><th>Risk score</th>
+<th>Preventive</th><th>Corrective</th><th>Replacement</th></tr>
+{"".join(rows)}
+</table>
+{"".join(sections)}
+</body></html>
+"""
+    path = os.path.join(out_dir, "index.html")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(document)
+    return path
+
+
+def write_pdf_index(out_dir, equipment, reports):
+    """fleet_report.pdf: one page per equipment with its chart and headline metrics"""
+    import numpy as np
+    from PIL import Image
+    from matplotlib.backends.backend_pdf import PdfPages
+    from matplotlib.figure import Figure
+
+    path = os.path.join(out_dir, "fleet_report.pdf")
+    with PdfPages(path) as pdf:
+        for eid, info in equipment.items():
+            report = reports.get(eid)
+            if report is None or "error" in report:
+                continue
+            metrics = report["metrics"]
+            needs = (report["priority"] or {}).get("maintenance_needs", {})
+            fig = Figure(figsize=(8.27, 11.69))  # A4
+            fig.text(0.05, 0.96, f"{eid} - {info['type']}, {info['location']}", fontsize=14, fontweight='bold')
+            fig.text(0.05, 0.92,
+                     f"Risk score {metrics['risk_score']}  |  Preventive {needs.get('preventive')}  |  "
+                     f"Corrective {needs.get('corrective')}  |  Replacement {needs.get('replacement')}",
+                     fontsize=10)
+            ax = fig.add_axes([0.05, 0.05, 0.9, 0.85])
+            # The 300-dpi chart decodes to ~280 MB as float RGBA; ~170 dpi on A4 is plenty
+            with Image.open(os.path.join(out_dir, metrics["chart_path"])) as chart:
+                chart.thumbnail((PDF_CHART_PIXELS, PDF_CHART_PIXELS))
+                ax.imshow(np.asarray(chart.convert("RGB")))
+            ax.axis('off')
+            pdf.savefig(fig)
+    return path
+
+
+def run_fleet_report(job, out_dir=None, workers=FLEET_REPORT_WORKERS, db_path=None, pdf=False, archive=False):
+    """
+    Build every equipment's report bundle plus the combined index. Progress goes to
+    `job` (done / total / failed / reports_per_second while the reports stage runs).
+    """
+    from generate_equipment_report import get_date_range_for_all_equipment
+    from maintenance import load_priority_features, predict_priorities
+
+    generated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    if out_dir is None:
+        out_dir = os.path.join(REPORTS_DIR, f"fleet-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{job.id[:6]}")
+    os.makedirs(out_dir, exist_ok=True)
+    fd, snapshot_path = tempfile.mkstemp(prefix="fleet_report_", suffix=".db")
+    os.close(fd)
+
+    start = time.perf_counter()
+    try:
+        with job.stage("snapshot"):
+            live = open_live_db(db_path)
+            try:
+                cursor = live.cursor()
+                # Created in the live file first so the snapshot has them too
+                ensure_equipment_stats(cursor)
+                ensure_usage_rollups(cursor)
+                take_snapshot(live, snapshot_path).close()
+            finally:
+                live.close()
+
+        snapshot = sqlite3.connect(snapshot_path)
+        try:
+            with job.stage("priorities"):
+                # One batch over the whole fleet, in this process; workers only render
+                priorities = predict_priorities(load_priority_features(snapshot))
+            equipment = {
+                row[0]: {"type": row[1], "location": row[2], "criticality": row[3]}
+                for row in snapshot.execute(
+                    "SELECT equipment_id, type, location, criticality FROM equipment ORDER BY equipment_id"
+                )
+            }
+            min_date, max_date = get_date_range_for_all_equipment(snapshot)
+        finally:
+            snapshot.close()
+
+        reports = {}
+        with job.stage("reports"):
+            total = len(equipment)
+            failed = 0
+            reports_start = time.perf_counter()
+            with ProcessPoolExecutor(
+                max_workers=max(1, workers),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(snapshot_path, out_dir, min_date, max_date),
+            ) as pool:
+                futures = [pool.submit(_build_report, eid, priorities.get(eid)) for eid in equipment]
+                for done, future in enumerate(as_completed(futures), start=1):
+                    report = future.result()
+                    reports[report["equipment_id"]] = report
+                    if "error" in report:
+                        failed += 1
+                        print(f"Report failed for {report['equipment_id']}: {report['error']}")
+                    elapsed = time.perf_counter() - reports_start
+                    rate = round(done / elapsed, 2) if elapsed else None
+                    job.set_progress({"done": done, "total": total, "failed": failed, "reports_per_second": rate})
+                    print(f"[{done}/{total}] {report['equipment_id']} ({rate} reports/s)")
+            reports_seconds = time.perf_counter() - reports_start
+
+        with job.stage("index"):
+            index_path = write_html_index(out_dir, equipment, reports, generated_at)
+            pdf_path = write_pdf_index(out_dir, equipment, reports) if pdf else None
+            archive_path = shutil.make_archive(out_dir, "zip", out_dir) if archive else None
+    finally:
+        if os.path.exists(snapshot_path):
+            os.remove(snapshot_path)
+
+    return {
+        "out_dir": out_dir,
+        "index": index_path,
+        "pdf": pdf_path,
+        "archive": archive_path,
+        "generated_at": generated_at,
+        "total": len(equipment),
+        "succeeded": len(equipment) - failed,
+        "failed": sorted(eid for eid, r in reports.items() if "error" in r),
+        "workers": workers,
+        "reports_per_second": round(len(reports) / reports_seconds, 2) if reports_seconds else None,
+        "total_seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate report bundles for every equipment and a combined index")
+    parser.add_argument("--out", help="Output directory (default: reports/fleet-<timestamp>)")
+    parser.add_argument("--workers", type=int, default=FLEET_REPORT_WORKERS, help="Worker processes")
+    parser.add_argument("--db", help="Live database path (default: same lookup as the API)")
+    parser.add_argument("--pdf", action="store_true", help="Also write fleet_report.pdf")
+    parser.add_argument("--zip", action="store_true", help="Also write <out>.zip")
+    args = parser.parse_args()
+
+    job = Job("fleet_report", len(REPORT_STAGES))
+    try:
+        result = run_fleet_report(job, args.out, args.workers, args.db, args.pdf, args.zip)
+    except Exception as e:
+        print(f"ERROR: fleet report failed: {e}")
+        sys.exit(1)
+    result["stage_seconds"] = job.stage_seconds
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
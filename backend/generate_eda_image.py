@@ -1,14 +1,30 @@
 # backend/generate_eda_image.py
 import sqlite3
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import numpy as np
 import os
-import matplotlib.patches as mpatches
+import io
 
-def generate_eda_image():
-    conn = sqlite3.connect("hospital_equipment_system.db")
+DB_PATH = "hospital_equipment_system.db"
+
+# Tables the dashboard reads and, per table, the columns it plots (None: all). A change to
+# any of them gives the cached image a new key; bump "version" when the plotting changes.
+EDA_SOURCES = {
+    "equipment": None,
+    "failure_predictions": ["equipment_id", "needs_maintenance_10_days", "failure_probability"],
+    "personnel": ["role", "department"],
+    "maintenance_prediction_results": ["equipment_id", "predicted_to_fail", "preventive", "corrective", "replacement"],
+}
+EDA_RENDER_SETTINGS = {"version": 1, "figsize": (20, 12), "dpi": 150}
+
+def render_eda_png():
+    """PNG bytes of the overall EDA dashboard"""
+    # Imported here: seaborn/scipy take most of a second, and only render workers need them
+    import matplotlib.pyplot as plt
+    import matplotlib.patches as mpatches
+    import seaborn as sns
+
+    conn = sqlite3.connect(DB_PATH)
 
     # Load data
     equipment = pd.read_sql_query("SELECT * FROM equipment", conn)
@@ -42,7 +58,7 @@ def generate_eda_image():
     plt.rcParams['font.size'] = 10
 
     # === Dashboard Layout ===
-    fig = plt.figure(figsize=(20, 12))
+    fig = plt.figure(figsize=EDA_RENDER_SETTINGS["figsize"])
     fig.patch.set_facecolor('#f8fafc')
     gs = fig.add_gridspec(3, 6, height_ratios=[0.8, 1.5, 1.2],
                           width_ratios=[1, 1, 1, 1, 1, 1],
@@ -136,13 +152,17 @@ def generate_eda_image():
             spine.set_color('#e5e7eb')
             spine.set_linewidth(0.5)
 
-    # Save chart
-    path = "charts/eda_overall.png"
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=EDA_RENDER_SETTINGS["dpi"], bbox_inches='tight', facecolor='#f8fafc')
+    plt.close(fig)
+    conn.close()
+    return buffer.getvalue()
+
+def generate_eda_image():
+    """Render the dashboard to charts/eda_overall.png and return its path"""
     charts_dir = os.path.join(os.path.dirname(__file__), "charts")
     os.makedirs(charts_dir, exist_ok=True)
     path = os.path.join(charts_dir, "eda_overall.png")
-    
-    plt.savefig(path, dpi=150, bbox_inches='tight', facecolor='#f8fafc')
-    plt.close()
-    conn.close()
+    with open(path, "wb") as f:
+        f.write(render_eda_png())
     return path
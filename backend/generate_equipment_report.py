@@ -1,8 +1,8 @@
 # backend/generate_equipment_report.py
-import matplotlib
-matplotlib.use('Agg')  #  Set backend first!
-
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import io
+import hashlib
 import sqlite3
 import pandas as pd
 import numpy as np
@@ -10,6 +10,10 @@ import os
 from datetime import datetime
 import warnings
 import math
+from chart_cache import trend_chart_cache
+from render_pool import render_pool, RenderUnavailable
+from priority_labels import priority_labels
+from usage_rollups import read_usage_date_range, read_usage_daily
 warnings.filterwarnings('ignore')
 
 DB_PATH = "hospital_equipment_system.db"
@@ -25,6 +29,15 @@ AXIS_LIMITS = {
     'error_count': (0, 10)       # 0-10 errors
 }
 
+# Everything besides the data that changes the rendered chart; part of the cache key.
+# Bump "version" when the plotting code changes.
+CHART_RENDER_SETTINGS = {
+    "version": 1,
+    "figsize": (14, 14),
+    "dpi": 300,
+    "axis_limits": AXIS_LIMITS,
+}
+
 def safe_float(value, default=0.0):
     """Safely convert value to float, handling NaN and inf values"""
     try:
@@ -57,30 +70,114 @@ def safe_sum(series, default=0.0):
     sum_val = series.sum()
     return safe_float(sum_val, default)
 
-def get_date_range_for_all_equipment():
+def get_date_range_for_all_equipment(conn=None):
     """Get the overall date range across all equipment for consistent x-axis"""
-    conn = sqlite3.connect(DB_PATH)
-    
-    # Get min and max dates across all usage logs
-    date_query = """
-    SELECT MIN(timestamp) as min_date, MAX(timestamp) as max_date 
-    FROM usage_logs
-    """
-    date_df = pd.read_sql(date_query, conn)
-    conn.close()
-    
-    if not date_df.empty and not pd.isna(date_df['min_date'].iloc[0]):
-        min_date = pd.to_datetime(date_df['min_date'].iloc[0])
-        max_date = pd.to_datetime(date_df['max_date'].iloc[0])
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(DB_PATH)
+
+    # Min and max dates across all usage logs, kept current by usage_logs triggers
+    min_timestamp, max_timestamp = read_usage_date_range(conn.cursor())
+    if own_conn:
+        conn.close()
+
+    if min_timestamp is not None:
+        min_date = pd.to_datetime(min_timestamp)
+        max_date = pd.to_datetime(max_timestamp)
         return min_date, max_date
     else:
         # Fallback to a reasonable date range
         return pd.Timestamp('2024-01-01'), pd.Timestamp('2024-12-31')
 
-def fetch_equipment_metrics(equipment_id: str):
+def _png_bytes(fig, dpi):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=dpi, bbox_inches='tight')
+    return buffer.getvalue()
+
+def render_trend_chart_png(equipment_id, daily_usage, min_date, max_date):
+    """
+    PNG bytes of the 4-panel trend chart. Draws on its own Figure with an Agg
+    canvas instead of the global pyplot state, so concurrent renders don't mix.
+    """
+    fig = Figure(figsize=CHART_RENDER_SETTINGS["figsize"])
+    FigureCanvasAgg(fig)
+    axs = fig.subplots(4, 1, sharex=True)
+
+    # Usage Hours Plot with fixed scale
+    axs[0].plot(daily_usage['date'], daily_usage['usage_hours'], marker='o', label='Avg Usage Hours', color='teal', linewidth=2, markersize=4)
+    axs[0].set_ylabel("Usage Hours", fontweight='bold')
+    axs[0].set_title(f"Daily Usage Trend - {equipment_id}", fontweight='bold', fontsize=14)
+    axs[0].set_ylim(AXIS_LIMITS['usage_hours'])  # Fixed scale
+    axs[0].set_xlim(min_date, max_date)  # Fixed date range
+    axs[0].legend()
+    axs[0].grid(True, alpha=0.3)
+
+    # CPU Temperature Plot with fixed scale
+    axs[1].plot(daily_usage['date'], daily_usage['avg_cpu_temp'], marker='x', label='Avg CPU Temp', color='coral', linewidth=2, markersize=4)
+    axs[1].set_ylabel("CPU Temp (°C)", fontweight='bold')
+    axs[1].set_ylim(AXIS_LIMITS['cpu_temp'])  # Fixed scale
+    axs[1].set_xlim(min_date, max_date)  # Fixed date range
+    axs[1].legend()
+    axs[1].grid(True, alpha=0.3)
+
+    # Workload Level Plot with fixed scale
+    axs[2].plot(daily_usage['date'], daily_usage['workload_level'], marker='s', label='Workload Level', color='purple', linewidth=2, markersize=4)
+    axs[2].set_ylabel("Workload Level", fontweight='bold')
+    axs[2].set_ylim(AXIS_LIMITS['workload_level'])  # Fixed scale
+    axs[2].set_xlim(min_date, max_date)  # Fixed date range
+    axs[2].legend()
+    axs[2].grid(True, alpha=0.3)
+
+    # Error Count Plot with fixed scale
+    axs[3].plot(daily_usage['date'], daily_usage['error_count'], marker='^', label='Error Count', color='red', linewidth=2, markersize=4)
+    axs[3].set_ylabel("Error Count", fontweight='bold')
+    axs[3].set_xlabel("Date", fontweight='bold')
+    axs[3].set_ylim(AXIS_LIMITS['error_count'])  # Fixed scale
+    axs[3].set_xlim(min_date, max_date)  # Fixed date range
+    axs[3].legend()
+    axs[3].grid(True, alpha=0.3)
+
+    # Format x-axis dates consistently
+    axs[3].tick_params(axis='x', labelrotation=45)
     
-    conn = sqlite3.connect(DB_PATH)
+    # Safe calculations for stats
+    avg_usage = safe_mean(daily_usage['usage_hours'])
+    avg_temp = safe_mean(daily_usage['avg_cpu_temp'])
+    avg_workload = safe_mean(daily_usage['workload_level'])
+    total_errors = safe_sum(daily_usage['error_count'])
+    
+    stats = f"""Equipment: {equipment_id}
+Total Days: {len(daily_usage)}
+Avg Usage Hours: {avg_usage:.1f}
+Avg CPU Temp: {avg_temp:.1f}°C
+Avg Workload: {avg_workload:.1f}
+Total Errors: {int(total_errors)}
+
+Scale Ranges:
+Usage: {AXIS_LIMITS['usage_hours'][0]}-{AXIS_LIMITS['usage_hours'][1]}h
+Temp: {AXIS_LIMITS['cpu_temp'][0]}-{AXIS_LIMITS['cpu_temp'][1]}°C
+Workload: {AXIS_LIMITS['workload_level'][0]}-{AXIS_LIMITS['workload_level'][1]}
+Errors: {AXIS_LIMITS['error_count'][0]}-{AXIS_LIMITS['error_count'][1]}"""
+    
+    fig.text(0.02, 0.02, stats, fontsize=9,
+             bbox=dict(boxstyle="round,pad=0.5", facecolor="lightyellow", alpha=0.8))
+
+    fig.tight_layout()
+    fig.subplots_adjust(bottom=0.25)  # More space for stats box
+    return _png_bytes(fig, CHART_RENDER_SETTINGS["dpi"])
+
+def render_placeholder_png(equipment_id, error):
+    fig = Figure(figsize=(8, 6))
+    FigureCanvasAgg(fig)
+    fig.text(0.5, 0.5, f"Chart unavailable for {equipment_id}\nError: {str(error)}", 
+             ha='center', va='center', fontsize=14)
+    return _png_bytes(fig, 300)
 
+def equipment_metrics(conn, equipment_id):
+    """
+    (metrics, daily_usage) for one equipment read through `conn`. metrics["chart_path"]
+    is left for the caller, which decides where (and whether) the chart is drawn.
+    """
     # 1. Equipment Age
     eq_df = pd.read_sql("SELECT equipment_id, installation_date FROM equipment WHERE equipment_id = ?", conn, params=(equipment_id,))
     if eq_df.empty:
@@ -99,137 +196,13 @@ def fetch_equipment_metrics(equipment_id: str):
     response_time = safe_mean(maint_df["response_time_hours"]) if not maint_df.empty else 0.0
     num_failures = len(maint_df) if not maint_df.empty else 0
 
-    # 3. Usage logs for plotting trends
-    usage_df = pd.read_sql("SELECT * FROM usage_logs WHERE equipment_id = ?", conn, params=(equipment_id,))
-    conn.close()
-
-    usage_df["timestamp"] = pd.to_datetime(usage_df["timestamp"])
-    if usage_df.empty:
+    # 3. Daily usage for plotting trends, from the usage_daily rollup
+    daily_usage = read_usage_daily(conn, equipment_id)
+    if daily_usage.empty:
         raise ValueError(f"No usage logs found for {equipment_id}")
 
-    # Clean usage data
-    usage_df = usage_df.fillna(0)  # Replace NaN with 0
-    usage_df = usage_df.replace([np.inf, -np.inf], 0)  # Replace inf with 0
-
-    usage_df['date'] = usage_df['timestamp'].dt.date
-    daily_usage = usage_df.groupby('date').agg({
-        'usage_hours': 'mean',
-        'avg_cpu_temp': 'mean',
-        'workload_level': 'mean',
-        'error_count': 'sum',
-        'timestamp': 'first'
-    }).reset_index()
-    
-    # Clean aggregated data
-    daily_usage = daily_usage.fillna(0)
-    daily_usage = daily_usage.replace([np.inf, -np.inf], 0)
-    
-    daily_usage['date'] = pd.to_datetime(daily_usage['date'])
-    daily_usage = daily_usage.sort_values('date')
-
-    # 4. Classification labels with safe handling
-    pm_path = "labeled_preventive_data.csv"
-    cm_path = "labeled_corrective_data.csv"
-    rp_path = "labeled_replacement_data.csv"
-
-    try:
-        pm_label = pd.read_csv(pm_path).set_index("equipment_id").loc[equipment_id, "preventive_label"]
-    except (FileNotFoundError, KeyError):
-        pm_label = "Medium"  # Default fallback
-        
-    try:
-        cm_label = pd.read_csv(cm_path).set_index("equipment_id").loc[equipment_id, "corrective_label"]
-    except (FileNotFoundError, KeyError):
-        cm_label = "Medium"  # Default fallback
-        
-    try:
-        rp_label = pd.read_csv(rp_path).set_index("equipment_id").loc[equipment_id, "replacement_label"]
-    except (FileNotFoundError, KeyError):
-        rp_label = "Low"  # Default fallback
-
-    # 5. Plot trends and save to charts/trend_graph.png with CONSISTENT SCALES
-    chart_path = os.path.join(CHARTS_DIR, "trend_graph.png")
-    
-    try:
-        # Get consistent date range for x-axis
-        min_date, max_date = get_date_range_for_all_equipment()
-        
-        fig, axs = plt.subplots(4, 1, figsize=(14, 14), sharex=True)
-
-        # Usage Hours Plot with fixed scale
-        axs[0].plot(daily_usage['date'], daily_usage['usage_hours'], marker='o', label='Avg Usage Hours', color='teal', linewidth=2, markersize=4)
-        axs[0].set_ylabel("Usage Hours", fontweight='bold')
-        axs[0].set_title(f"Daily Usage Trend - {equipment_id}", fontweight='bold', fontsize=14)
-        axs[0].set_ylim(AXIS_LIMITS['usage_hours'])  # Fixed scale
-        axs[0].set_xlim(min_date, max_date)  # Fixed date range
-        axs[0].legend()
-        axs[0].grid(True, alpha=0.3)
-
-        # CPU Temperature Plot with fixed scale
-        axs[1].plot(daily_usage['date'], daily_usage['avg_cpu_temp'], marker='x', label='Avg CPU Temp', color='coral', linewidth=2, markersize=4)
-        axs[1].set_ylabel("CPU Temp (°C)", fontweight='bold')
-        axs[1].set_ylim(AXIS_LIMITS['cpu_temp'])  # Fixed scale
-        axs[1].set_xlim(min_date, max_date)  # Fixed date range
-        axs[1].legend()
-        axs[1].grid(True, alpha=0.3)
-
-        # Workload Level Plot with fixed scale
-        axs[2].plot(daily_usage['date'], daily_usage['workload_level'], marker='s', label='Workload Level', color='purple', linewidth=2, markersize=4)
-        axs[2].set_ylabel("Workload Level", fontweight='bold')
-        axs[2].set_ylim(AXIS_LIMITS['workload_level'])  # Fixed scale
-        axs[2].set_xlim(min_date, max_date)  # Fixed date range
-        axs[2].legend()
-        axs[2].grid(True, alpha=0.3)
-
-        # Error Count Plot with fixed scale
-        axs[3].plot(daily_usage['date'], daily_usage['error_count'], marker='^', label='Error Count', color='red', linewidth=2, markersize=4)
-        axs[3].set_ylabel("Error Count", fontweight='bold')
-        axs[3].set_xlabel("Date", fontweight='bold')
-        axs[3].set_ylim(AXIS_LIMITS['error_count'])  # Fixed scale
-        axs[3].set_xlim(min_date, max_date)  # Fixed date range
-        axs[3].legend()
-        axs[3].grid(True, alpha=0.3)
-
-        # Format x-axis dates consistently
-        plt.xticks(rotation=45)
-        
-        # Safe calculations for stats
-        avg_usage = safe_mean(daily_usage['usage_hours'])
-        avg_temp = safe_mean(daily_usage['avg_cpu_temp'])
-        avg_workload = safe_mean(daily_usage['workload_level'])
-        total_errors = safe_sum(daily_usage['error_count'])
-        
-        stats = f"""Equipment: {equipment_id}
-Total Days: {len(daily_usage)}
-Avg Usage Hours: {avg_usage:.1f}
-Avg CPU Temp: {avg_temp:.1f}°C
-Avg Workload: {avg_workload:.1f}
-Total Errors: {int(total_errors)}
-
-Scale Ranges:
-Usage: {AXIS_LIMITS['usage_hours'][0]}-{AXIS_LIMITS['usage_hours'][1]}h
-Temp: {AXIS_LIMITS['cpu_temp'][0]}-{AXIS_LIMITS['cpu_temp'][1]}°C
-Workload: {AXIS_LIMITS['workload_level'][0]}-{AXIS_LIMITS['workload_level'][1]}
-Errors: {AXIS_LIMITS['error_count'][0]}-{AXIS_LIMITS['error_count'][1]}"""
-        
-        plt.figtext(0.02, 0.02, stats, fontsize=9,
-                    bbox=dict(boxstyle="round,pad=0.5", facecolor="lightyellow", alpha=0.8))
-
-        plt.tight_layout()
-        plt.subplots_adjust(bottom=0.25)  # More space for stats box
-        plt.savefig(chart_path, dpi=300, bbox_inches='tight')
-        plt.close()  # Prevent memory/thread issues
-        
-        print(f"Chart saved for {equipment_id} with consistent scales")
-        
-    except Exception as e:
-        print(f"Error creating chart: {e}")
-        # Create a simple fallback chart or skip chart creation
-        plt.figure(figsize=(8, 6))
-        plt.text(0.5, 0.5, f"Chart unavailable for {equipment_id}\nError: {str(e)}", 
-                ha='center', va='center', fontsize=14)
-        plt.savefig(chart_path, dpi=300, bbox_inches='tight')
-        plt.close()
+    # 4. Classification labels (Medium/Medium/Low when a file or row is missing)
+    pm_label, cm_label, rp_label = priority_labels.labels(equipment_id)
 
     # 6. Return combined metrics for LLM with safe calculations
     avg_usage_hours = safe_mean(daily_usage["usage_hours"])
@@ -244,7 +217,7 @@ Errors: {AXIS_LIMITS['error_count'][0]}-{AXIS_LIMITS['error_count'][1]}"""
     )))
     risk_score = safe_int(risk_score)
 
-    return {
+    metrics = {
         "equipment_id": equipment_id,
         "equipment_age": safe_int(eq_df["equipment_age"].iloc[0]),
         "downtime_hours": safe_float(downtime),
@@ -260,9 +233,58 @@ Errors: {AXIS_LIMITS['error_count'][0]}-{AXIS_LIMITS['error_count'][1]}"""
         "avg_cpu_temp": safe_float(avg_cpu_temp),
         "error_count": safe_int(total_error_count),
         "risk_score": risk_score,
-        "chart_path": chart_path,
+        "chart_path": None,
         "axis_limits": AXIS_LIMITS  # Include limits in output for reference
     }
+    return metrics, daily_usage
+
+def _fetch_equipment_metrics(equipment_id, load_chart):
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        metrics, daily_usage = equipment_metrics(conn, equipment_id)
+    finally:
+        conn.close()
+
+    # Plot trends with CONSISTENT SCALES, or reuse the cached chart for this data version
+    min_date, max_date = get_date_range_for_all_equipment()
+    # The plotted rows themselves are the data version
+    usage_digest = hashlib.sha1(pd.util.hash_pandas_object(daily_usage, index=False).values.tobytes()).hexdigest()
+    chart_path = trend_chart_cache.path_for(
+        equipment_id, usage_digest, (str(min_date), str(max_date)), CHART_RENDER_SETTINGS
+    )
+
+    png = None
+    with trend_chart_cache.lock(chart_path):
+        hit = trend_chart_cache.read(chart_path) if load_chart else trend_chart_cache.lookup(chart_path)
+        if hit:
+            png = hit if load_chart else None
+            print(f"Chart cache hit for {equipment_id}")
+        else:
+            try:
+                png = render_pool.render(chart_path, render_trend_chart_png, equipment_id, daily_usage, min_date, max_date)
+                trend_chart_cache.put(chart_path, png)
+                print(f"Chart saved for {equipment_id} with consistent scales")
+            except RenderUnavailable as e:
+                # Renderer saturated: serve the metrics without a chart rather than queue up
+                print(f"Chart skipped for {equipment_id}: {e}")
+            except Exception as e:
+                print(f"Error creating chart: {e}")
+                # Placeholder under its own key, so the next request retries the real chart
+                # while the file still counts toward the cache size and gets evicted
+                png = render_placeholder_png(equipment_id, e)
+                chart_path = trend_chart_cache.path_for(equipment_id, "unavailable")
+                trend_chart_cache.put(chart_path, png)
+
+    metrics["chart_path"] = chart_path
+    return metrics, png
+
+def fetch_equipment_metrics(equipment_id: str):
+    """Metrics for the LLM; metrics["chart_path"] is the equipment's cached trend chart"""
+    return _fetch_equipment_metrics(equipment_id, load_chart=False)[0]
+
+def fetch_equipment_metrics_with_chart(equipment_id: str):
+    """(metrics, PNG bytes of the trend chart), without reading back a freshly rendered file"""
+    return _fetch_equipment_metrics(equipment_id, load_chart=True)
 
 # Optional: Function to update axis limits based on your data analysis
 def update_axis_limits_from_data():
@@ -16,10 +16,11 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 GROQ_MODEL = "meta-llama/llama-4-scout-17b-16e-instruct"
 GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
 
-def generate_llm_explanation(equipment_metrics: dict, role: str, image_path: str = "") -> str:
+def generate_llm_explanation(equipment_metrics: dict, role: str, image_path: str = "", image_bytes: bytes = None) -> str:
     """
     Generate equipment health explanation using Groq Vision API
     (Function name kept as 'ollama' for compatibility with existing routes)
+    image_bytes, when given, is used instead of reading image_path
     """
     role = role.lower()
     tone = {
@@ -77,9 +78,11 @@ Provide a comprehensive analysis that combines both visual data interpretation a
         message_content = [{"type": "text", "text": prompt}]
         
         # Add image if provided
-        if image_path and os.path.exists(image_path):
+        if image_bytes is None and image_path and os.path.exists(image_path):
             with open(image_path, "rb") as img_file:
-                base64_image = base64.b64encode(img_file.read()).decode()
+                image_bytes = img_file.read()
+        if image_bytes:
+            base64_image = base64.b64encode(image_bytes).decode()
             message_content.append({
                 "type": "image_url",
                 "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}
@@ -1,23 +1,43 @@
 #backend/main.py
-from fastapi import FastAPI
+from fastapi import FastAPI, Response, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import os
+from contextlib import asynccontextmanager
 import sqlite3
 import pandas as pd
 import numpy as np
 from auth import router as auth_router
 from equipments import router as equipment_router
-from maintenance import router as maintenance_router
-from predict import router as predict_router
+from maintenance import router as maintenance_router, init_priority_cache
+from predict import router as predict_router, prediction_models
+from prediction_scheduler import prediction_scheduler
+from model_registry import model_registry
+from chart_cache import trend_chart_cache, eda_chart_cache
+from render_pool import render_pool
+from dependencies import require_role
 from users import router as user_router
 from equipment_calendar import router as calendar_router
 from eda import router as eda_router
+from reports import router as reports_router
 from dotenv import load_dotenv
 load_dotenv()
 
 
-app = FastAPI(title="Hospital Equipment Maintenance API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load prediction models in the background so requests are served right away
+    prediction_models.start()
+    # Schema changes happen here, not on the first request that reads the tables
+    init_priority_cache()
+    # Periodic fleet re-scoring; only one worker process holds the scheduler lock
+    prediction_scheduler.start()
+    yield
+    prediction_scheduler.stop()
+    render_pool.shutdown()
+
+
+app = FastAPI(title="Hospital Equipment Maintenance API", lifespan=lifespan)
 
 # Enable CORS for your frontend - FIXED
 app.add_middleware(
@@ -47,12 +67,33 @@ app.include_router(predict_router, prefix="/predict", tags=["Prediction"])
 app.include_router(user_router, prefix="/users", tags=["Users"])
 app.include_router(calendar_router, prefix="/calendar", tags=["Calendar"])
 app.include_router(eda_router)
+app.include_router(reports_router, prefix="/reports", tags=["Reports"])
 
 # Health check endpoint for Render
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
 
+# Readiness: prediction models finished warming up (failed loads fall back to rules)
+@app.get("/ready")
+def readiness_check(response: Response):
+    status = prediction_models.status()
+    if not status["ready"]:
+        response.status_code = 503
+    return status
+
+# Runtime stats of the background subsystems, kept off /ready so probes stay cheap
+@app.get("/metrics", dependencies=[Depends(require_role("admin"))])
+def runtime_metrics():
+    status = {"scheduler": prediction_scheduler.status()}
+    # Priority classifiers: load counts, cache hits and timings per artifact
+    status["model_registry"] = model_registry.stats()
+    status["chart_cache"] = trend_chart_cache.stats()
+    status["eda_cache"] = eda_chart_cache.stats()
+    # Chart worker processes: queue depth, rejections, timeouts and render times
+    status["render_pool"] = render_pool.stats()
+    return status
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", 8000)))
\ No newline at end of file
@@ -1,21 +1,28 @@
 #backend/maintenance.py
-from fastapi import APIRouter, HTTPException, Depends, Body
+from fastapi import APIRouter, HTTPException, Depends, Body, Request, Response
 from pydantic import BaseModel
 from typing import Union
 import sqlite3
 import pandas as pd
-import joblib
 from datetime import datetime
 from llm_engine import generate_llm_explanation
 from dependencies import get_current_user, require_role
 from fastapi import File, UploadFile
 import base64
-from generate_equipment_report import fetch_equipment_metrics
+import hashlib
+import json
 from database import get_db
+from model_registry import model_registry
+from predict import ensure_prediction_schema, load_skip_set
+from equipment_stats import ensure_equipment_stats
+from data_versions import ensure_data_versions, read_data_versions
 
 import os
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# Stored priority results older than this are recomputed on the next read (0 = never expire)
+PRIORITY_CACHE_TTL_MINUTES = float(os.getenv("PRIORITY_CACHE_TTL_MINUTES", "60"))
+
 router = APIRouter()
 
 # --- Base model for Technician ---
@@ -59,6 +66,8 @@ def reset_equipment_health_predictions(equipment_id: str):
     
     try:
         print(f"Resetting health predictions for equipment: {equipment_id}")
+        # The dirty-flag update below needs the column on databases not migrated yet
+        ensure_priority_cache_schema(cursor)
         
         # First check if records exist
         cursor.execute("SELECT COUNT(*) FROM maintenance_prediction_results WHERE equipment_id = ?", (equipment_id,))
@@ -121,6 +130,10 @@ def reset_equipment_health_predictions(equipment_id: str):
         """, (equipment_id,))
         print(f"Inserted fresh failure_predictions record for {equipment_id}")
         
+        # The failure_predictions writes above dirtied the row through the cache triggers;
+        # the reset values are the intended result, so keep them
+        cursor.execute("UPDATE maintenance_prediction_results SET dirty = 0 WHERE equipment_id = ?", (equipment_id,))
+
         # Commit all changes
         conn.commit()
         print(f"Successfully reset health predictions for equipment {equipment_id}")
@@ -204,7 +217,7 @@ def get_full_maintenance_priority(equipment_id: str, user=Depends(get_current_us
 
     conn = get_db()
     
-    # First check if we have existing prediction results that are recent
+    # First check if we have existing prediction results that are still valid
     cursor = conn.cursor()
     cursor.execute("""
         SELECT predicted_to_fail, preventive, corrective, replacement, last_updated
@@ -213,11 +226,12 @@ def get_full_maintenance_priority(equipment_id: str, user=Depends(get_current_us
     """, (equipment_id,))
     
     existing_result = cursor.fetchone()
-    
-    # If we have recent results (within last hour), return them
-    if existing_result:
+    stale = find_stale_priority_ids(cursor, [equipment_id]) if existing_result else set()
+    conn.close()
+
+    # Fresh results (not dirtied by a data change, within the TTL) are returned as is
+    if existing_result and equipment_id not in stale:
         print(f"Found existing prediction results for {equipment_id}: {existing_result}")
-        conn.close()
         return {
             "equipment_id": equipment_id,
             "predicted_to_fail": bool(existing_result[0]),
@@ -229,82 +243,305 @@ def get_full_maintenance_priority(equipment_id: str, user=Depends(get_current_us
         }
     
     # Otherwise, run the full prediction logic
+    scored = score_priority_batch([equipment_id])
+    if equipment_id not in scored:
+        raise HTTPException(status_code=404, detail="Equipment not found")
+
+    return {"equipment_id": equipment_id, **scored[equipment_id]}
+
+def ensure_priority_cache_schema(cursor):
+    """
+    Add the `dirty` flag to maintenance_prediction_results and the triggers that set it
+    when an input of the priority features changes. Runs once per process and database file,
+    from init_priority_cache() at startup and from the writers; read handlers rely on it.
+    """
+    database = _database_file(cursor)
+    if database in _priority_cache_ready:
+        return
+    ensure_prediction_schema(cursor)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS maintenance_prediction_results (
+        equipment_id TEXT PRIMARY KEY,
+        predicted_to_fail INTEGER,
+        preventive TEXT,
+        corrective TEXT,
+        replacement TEXT,
+        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    cursor.execute("PRAGMA table_info(maintenance_prediction_results)")
+    if "dirty" not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute("ALTER TABLE maintenance_prediction_results ADD COLUMN dirty INTEGER NOT NULL DEFAULT 0")
+
+    mark_dirty = "UPDATE maintenance_prediction_results SET dirty = 1 WHERE equipment_id = {eid}"
+    triggers = {
+        # Downtime, failure count and response time come from maintenance_logs
+        "trg_mpr_dirty_maintenance_insert": ("AFTER INSERT ON maintenance_logs", mark_dirty.format(eid="NEW.equipment_id")),
+        "trg_mpr_dirty_maintenance_delete": ("AFTER DELETE ON maintenance_logs", mark_dirty.format(eid="OLD.equipment_id")),
+        "trg_mpr_dirty_maintenance_update": (
+            "AFTER UPDATE OF equipment_id, downtime_hours, response_time_hours ON maintenance_logs",
+            mark_dirty.format(eid="OLD.equipment_id") + "; " + mark_dirty.format(eid="NEW.equipment_id"),
+        ),
+        # Only a change of the needs-maintenance flag affects the priority features
+        "trg_mpr_dirty_failure_insert": (
+            "AFTER INSERT ON failure_predictions",
+            mark_dirty.format(eid="NEW.equipment_id") + " AND predicted_to_fail IS NOT NEW.needs_maintenance_10_days",
+        ),
+        "trg_mpr_dirty_failure_update": (
+            "AFTER UPDATE OF needs_maintenance_10_days ON failure_predictions",
+            mark_dirty.format(eid="NEW.equipment_id") + " AND predicted_to_fail IS NOT NEW.needs_maintenance_10_days",
+        ),
+        "trg_mpr_dirty_failure_delete": (
+            "AFTER DELETE ON failure_predictions",
+            mark_dirty.format(eid="OLD.equipment_id") + " AND predicted_to_fail IS NOT 0",
+        ),
+        # Equipment age is derived from installation_date
+        "trg_mpr_dirty_equipment_update": (
+            "AFTER UPDATE OF installation_date ON equipment",
+            mark_dirty.format(eid="NEW.equipment_id"),
+        ),
+        "trg_mpr_equipment_delete": (
+            "AFTER DELETE ON equipment",
+            "DELETE FROM maintenance_prediction_results WHERE equipment_id = OLD.equipment_id",
+        ),
+    }
+    for name, (event, body) in triggers.items():
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body}; END")
+    cursor.connection.commit()
+    _priority_cache_ready.add(database)
+
+_priority_cache_ready = set()
+
+def init_priority_cache():
+    """
+    Startup migration: prediction tables and indexes, the priority cache flag and triggers,
+    and the data_versions counters behind the /priority ETag
+    """
+    conn = get_db()
+    try:
+        cursor = conn.cursor()
+        ensure_priority_cache_schema(cursor)
+        ensure_data_versions(cursor, PRIORITY_SOURCES)
+    finally:
+        conn.close()
+
+def _database_file(cursor):
+    cursor.execute("PRAGMA database_list")
+    return next(row[2] for row in cursor.fetchall() if row[1] == "main")
+
+def find_stale_priority_ids(cursor, equipment_ids=None):
+    """
+    Ids whose stored priority result must be recomputed: marked dirty by a data change,
+    or older than PRIORITY_CACHE_TTL_MINUTES. Expiry does not apply while a
+    post-maintenance reset is being preserved (same window as the /predict skip rules).
+    """
     query = """
+        SELECT equipment_id, dirty,
+               ? > 0 AND last_updated < datetime('now', ?) AS expired
+        FROM maintenance_prediction_results
+        WHERE (dirty = 1 OR (? > 0 AND last_updated < datetime('now', ?)))
+    """
+    ttl = (PRIORITY_CACHE_TTL_MINUTES, f"-{PRIORITY_CACHE_TTL_MINUTES} minutes")
+    params = ttl + ttl
+    # A single-equipment read is a primary-key lookup
+    if equipment_ids is not None and len(equipment_ids) <= PRIORITY_IN_CLAUSE_LIMIT:
+        query += f" AND equipment_id IN ({','.join('?' * len(equipment_ids))})"
+        params += tuple(equipment_ids)
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    if equipment_ids is not None and len(equipment_ids) > PRIORITY_IN_CLAUSE_LIMIT:
+        wanted = set(equipment_ids)
+        rows = [row for row in rows if row[0] in wanted]
+
+    hold = load_skip_set(cursor) if any(expired and not dirty for _, dirty, expired in rows) else set()
+    return {eid for eid, dirty, expired in rows if dirty or eid not in hold}
+
+def refresh_stale_priorities():
+    """Recompute every dirty or expired priority result; returns how many were refreshed"""
+    conn = get_db()
+    try:
+        cursor = conn.cursor()
+        ensure_priority_cache_schema(cursor)
+        stale = find_stale_priority_ids(cursor)
+    finally:
+        conn.close()
+    if not stale:
+        return 0
+    return len(score_priority_batch(sorted(stale)))
+
+# Raw priority features. Downtime, log count and response time come from equipment_stats,
+# kept current by triggers on maintenance_logs, so this is a primary-key lookup per
+# equipment instead of an aggregate over its log history.
+PRIORITY_FEATURES_QUERY = """
     SELECT e.equipment_id, e.installation_date,
-           COALESCE(SUM(m.downtime_hours), 0) AS downtime,
-           COUNT(m.maintenance_id) AS failures,
-           COALESCE(AVG(m.response_time_hours), 0) AS avg_response,
+           COALESCE(s.downtime_sum, 0) AS downtime,
+           COALESCE(s.log_count, 0) AS failures,
+           COALESCE(s.response_sum / NULLIF(s.response_count, 0), 0) AS avg_response,
            COALESCE(f.needs_maintenance_10_days, 0) AS needs_maintenance_10_days
     FROM equipment e
-    LEFT JOIN maintenance_logs m ON e.equipment_id = m.equipment_id
+    LEFT JOIN equipment_stats s ON e.equipment_id = s.equipment_id
     LEFT JOIN failure_predictions f ON e.equipment_id = f.equipment_id
-    WHERE e.equipment_id = ?
-    GROUP BY e.equipment_id
-    """
-    df = pd.read_sql_query(query, conn, params=(equipment_id,))
-    conn.close()
+    {where}
+"""
 
-    if df.empty:
-        raise HTTPException(status_code=404, detail="Equipment not found")
+def read_priority_features(conn, where="", params=()):
+    ensure_equipment_stats(conn.cursor())
+    return pd.read_sql_query(PRIORITY_FEATURES_QUERY.format(where=where), conn, params=params)
 
-    df["installation_date"] = pd.to_datetime(df["installation_date"])
+PRIORITY_TYPES = ["preventive", "corrective", "replacement"]
+PRIORITY_LABELS = {0: "Low", 1: "Medium", 2: "High"}
+# Above this many ids the feature query reads the whole fleet and filters afterwards
+PRIORITY_IN_CLAUSE_LIMIT = 500
+
+def load_priority_features(conn, equipment_ids=None):
+    """
+    Priority-model features for many equipment in one query, indexed by equipment_id
+    """
+    params = ()
+    where = ""
+    if equipment_ids is not None and len(equipment_ids) <= PRIORITY_IN_CLAUSE_LIMIT:
+        where = f"WHERE e.equipment_id IN ({','.join('?' * len(equipment_ids))})"
+        params = tuple(equipment_ids)
+    df = read_priority_features(conn, where, params)
+    if equipment_ids is not None and not where:
+        df = df[df["equipment_id"].isin(set(equipment_ids))]
+
+    df["installation_date"] = pd.to_datetime(df["installation_date"], errors="coerce")
     df["equipment_age"] = (pd.Timestamp.today() - df["installation_date"]).dt.days // 365
 
-    features = df[[
-        "equipment_age",
-        "downtime",
-        "failures",
-        "avg_response",
-        "needs_maintenance_10_days"
-    ]]
-    features.columns = [
-        "equipment_age",
-        "downtime_hours",
-        "num_failures",
-        "response_time_hours",
-        "needs_maintenance_10_days"
-    ]
-
-    scaler = joblib.load(os.path.join(BASE_DIR, "saved_models", "multi_priority_scaler.pkl"))
-    X_scaled = scaler.transform(features)
+    features = df[["equipment_id", "equipment_age", "downtime", "failures", "avg_response", "needs_maintenance_10_days"]]
+    features.columns = ["equipment_id", "equipment_age", "downtime_hours", "num_failures", "response_time_hours", "needs_maintenance_10_days"]
+    # Equipment without a usable installation date can't be scored (the per-equipment route errors on them too)
+    return features.dropna().set_index("equipment_id")
 
-    def label(pred): return {0: "Low", 1: "Medium", 2: "High"}[pred]
+def predict_priorities(features):
+    """
+    Priority labels for a load_priority_features() frame: one scaler pass and one
+    predict() per model. Returns {equipment_id: {"predicted_to_fail", "maintenance_needs"}}.
+    """
+    if features.empty:
+        return {}
+    X_scaled = model_registry.get("multi_priority_scaler.pkl").transform(features)
+    labels = {
+        mtype: [PRIORITY_LABELS[pred] for pred in model_registry.get(f"{mtype}_model.pkl").predict(X_scaled)]
+        for mtype in PRIORITY_TYPES
+    }
+    predicted_to_fail = features["needs_maintenance_10_days"].astype(bool).tolist()
+    return {
+        eid: {
+            "predicted_to_fail": predicted_to_fail[i],
+            "maintenance_needs": {mtype: labels[mtype][i] for mtype in PRIORITY_TYPES},
+        }
+        for i, eid in enumerate(features.index)
+    }
 
-    results = {}
-    for mtype in ["preventive", "corrective", "replacement"]:
-        model = joblib.load(os.path.join(BASE_DIR, "saved_models", f"{mtype}_model.pkl"))
-        pred = model.predict(X_scaled)[0]
-        results[mtype] = label(pred)
+def score_priority_batch(equipment_ids=None):
+    """
+    Score maintenance priorities for many equipment at once (default: all) and upsert
+    them into maintenance_prediction_results: one feature query, one scaler pass and
+    one predict() per model. Returns {equipment_id: {"predicted_to_fail", "maintenance_needs"}}.
+    """
+    conn = get_db()
+    try:
+        results = predict_priorities(load_priority_features(conn, equipment_ids))
+        if not results:
+            return {}
+
+        rows = []
+        for eid, result in results.items():
+            needs = result["maintenance_needs"]
+            rows.append((eid, int(result["predicted_to_fail"]), needs["preventive"], needs["corrective"], needs["replacement"]))
+
+        conn.executemany("""
+            INSERT INTO maintenance_prediction_results (equipment_id, predicted_to_fail, preventive, corrective, replacement, last_updated, dirty)
+            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP, 0)
+            ON CONFLICT(equipment_id) DO UPDATE SET
+                predicted_to_fail = excluded.predicted_to_fail,
+                preventive = excluded.preventive,
+                corrective = excluded.corrective,
+                replacement = excluded.replacement,
+                last_updated = CURRENT_TIMESTAMP,
+                dirty = 0
+        """, rows)
+        conn.commit()
+    finally:
+        conn.close()
 
-    predicted_to_fail = bool(df["needs_maintenance_10_days"].iloc[0])
+    print(f"Batch-scored maintenance priorities for {len(results)} equipment")
+    return results
+
+# === Fleet priority snapshot ===
+# Tables whose data_versions counters make up the /priority ETag: the payload columns,
+# and what decides which equipment a caller sees
+PRIORITY_SOURCES = {
+    "maintenance_prediction_results": ["equipment_id", "predicted_to_fail", "preventive", "corrective", "replacement"],
+    "equipment": None,
+    "maintenance_logs": ["equipment_id", "status"],
+}
+
+def _etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+@router.get("/priority")
+def get_fleet_priority(request: Request, response: Response, user=Depends(get_current_user)):
+    """
+    Priority block of every equipment visible to the caller, in one response. The ETag
+    changes with the data versions of PRIORITY_SOURCES and the visible set; a matching
+    If-None-Match gets a 304 without a body.
+    """
+    # Technicians only see equipment with scheduled maintenance, as in /equipments
+    visible_filter = ""
+    if user["role"] == "technician":
+        visible_filter = "WHERE equipment_id IN (SELECT DISTINCT equipment_id FROM maintenance_logs WHERE status = 'Scheduled')"
 
-    # Save to database
     conn = get_db()
     cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO maintenance_prediction_results (equipment_id, predicted_to_fail, preventive, corrective, replacement, last_updated)
-        VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-        ON CONFLICT(equipment_id) DO UPDATE SET
-            predicted_to_fail = excluded.predicted_to_fail,
-            preventive = excluded.preventive,
-            corrective = excluded.corrective,
-            replacement = excluded.replacement,
-            last_updated = CURRENT_TIMESTAMP
-    """, (
-        equipment_id,
-        int(predicted_to_fail),
-        results["preventive"],
-        results["corrective"],
-        results["replacement"]
-    ))
-    conn.commit()
+    cursor.execute(f"SELECT equipment_id FROM equipment {visible_filter} ORDER BY equipment_id")
+    ids = [row[0] for row in cursor.fetchall()]
+
+    # Bring missing, dirty and expired results up to date first so the ETag reflects them
+    cursor.execute("SELECT equipment_id FROM maintenance_prediction_results")
+    stored = {row[0] for row in cursor.fetchall()}
+    stale = find_stale_priority_ids(cursor, ids)
     conn.close()
+    refresh = [eid for eid in ids if eid not in stored or eid in stale]
+    if refresh:
+        score_priority_batch(refresh)
 
-    return {
-        "equipment_id": equipment_id,
-        "predicted_to_fail": predicted_to_fail,
-        "maintenance_needs": results
-    }
+    conn = get_db()
+    try:
+        cursor = conn.cursor()
+        rows_filter = visible_filter or "WHERE 1=1"
+        versions = read_data_versions(cursor, PRIORITY_SOURCES)
+        ids_digest = hashlib.sha1(",".join(ids).encode()).hexdigest()
+        etag = '"' + hashlib.sha1(f"{json.dumps(versions, sort_keys=True)}|{ids_digest}".encode()).hexdigest() + '"'
+
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+
+        cursor.execute(f"""
+            SELECT equipment_id, predicted_to_fail, preventive, corrective, replacement
+            FROM maintenance_prediction_results
+            {rows_filter} AND equipment_id IN (SELECT equipment_id FROM equipment)
+            ORDER BY equipment_id
+        """)
+        priorities = [
+            {
+                "equipment_id": eid,
+                "predicted_to_fail": bool(predicted_to_fail),
+                "maintenance_needs": {"preventive": preventive, "corrective": corrective, "replacement": replacement}
+            }
+            for eid, predicted_to_fail, preventive, corrective, replacement in cursor.fetchall()
+        ]
+    finally:
+        conn.close()
+
+    response.headers.update(headers)
+    return {"priorities": priorities}
 
 # backend/maintenance.py - updated LLM route
 @router.get("/llm-explanation/{equipment_id}")
@@ -313,6 +550,7 @@ def get_llm_explanation(equipment_id: str, user=Depends(get_current_user)):
     try:
         # FIXED: Import the correct function name
         from llm_engine import generate_llm_explanation
+        from generate_equipment_report import fetch_equipment_metrics
         import os
 
         # Get metrics for LLM context
@@ -326,19 +564,7 @@ def get_llm_explanation(equipment_id: str, user=Depends(get_current_user)):
 
         # Get maintenance prediction data for LLM context
         conn = get_db()
-        query = """
-        SELECT e.equipment_id, e.installation_date,
-               COALESCE(SUM(m.downtime_hours), 0) AS downtime,
-               COUNT(CASE WHEN m.maintenance_id IS NOT NULL THEN 1 END) AS failures,
-               COALESCE(AVG(m.response_time_hours), 0) AS avg_response,
-               COALESCE(f.needs_maintenance_10_days, 0) AS needs_maintenance_10_days
-        FROM equipment e
-        LEFT JOIN maintenance_logs m ON e.equipment_id = m.equipment_id
-        LEFT JOIN failure_predictions f ON e.equipment_id = f.equipment_id
-        WHERE e.equipment_id = ?
-        GROUP BY e.equipment_id
-        """
-        df = pd.read_sql_query(query, conn, params=(equipment_id,))
+        df = read_priority_features(conn, "WHERE e.equipment_id = ?", (equipment_id,))
         conn.close()
         
         if df.empty:
@@ -350,7 +576,7 @@ def get_llm_explanation(equipment_id: str, user=Depends(get_current_user)):
         features = df[["equipment_age", "downtime", "failures", "avg_response", "needs_maintenance_10_days"]]
         features.columns = ["equipment_age", "downtime_hours", "num_failures", "response_time_hours", "needs_maintenance_10_days"]
 
-        scaler = joblib.load(os.path.join(BASE_DIR, "saved_models", "multi_priority_scaler.pkl"))
+        scaler = model_registry.get("multi_priority_scaler.pkl")
         X_scaled = scaler.transform(features)
 
         def label(pred): return {0: "Low", 1: "Medium", 2: "High"}[pred]
@@ -358,7 +584,7 @@ def get_llm_explanation(equipment_id: str, user=Depends(get_current_user)):
         # FIXED: Use 'maintenance_needs' instead of 'results'
         maintenance_needs = {}
         for mtype in ["preventive", "corrective", "replacement"]:
-            model = joblib.load(os.path.join(BASE_DIR, "saved_models", f"{mtype}_model.pkl"))
+            model = model_registry.get(f"{mtype}_model.pkl")
             pred = model.predict(X_scaled)[0]
             maintenance_needs[mtype] = label(pred)  # FIXED: Changed from results[mtype] to maintenance_needs[mtype]
 
@@ -403,6 +629,7 @@ def get_llm_explanation(equipment_id: str, user=Depends(get_current_user)):
 @router.get("/metrics/{equipment_id}")
 def get_equipment_metrics_only(equipment_id: str, user=Depends(get_current_user)):
     """Get equipment metrics and chart without LLM explanation - Updated for Render deployment"""
+    from generate_equipment_report import fetch_equipment_metrics
     import os
     
     # Get full metrics from existing function
@@ -421,19 +648,7 @@ def get_equipment_metrics_only(equipment_id: str, user=Depends(get_current_user)
 
     # Get maintenance predictions (this is where downtime, failures, response time come from)
     conn = get_db()
-    query = """
-    SELECT e.equipment_id, e.installation_date,
-           COALESCE(SUM(m.downtime_hours), 0) AS downtime,
-           COUNT(CASE WHEN m.maintenance_id IS NOT NULL THEN 1 END) AS failures,
-           COALESCE(AVG(m.response_time_hours), 0) AS avg_response,
-           COALESCE(f.needs_maintenance_10_days, 0) AS needs_maintenance_10_days
-    FROM equipment e
-    LEFT JOIN maintenance_logs m ON e.equipment_id = m.equipment_id
-    LEFT JOIN failure_predictions f ON e.equipment_id = f.equipment_id
-    WHERE e.equipment_id = ?
-    GROUP BY e.equipment_id
-    """
-    df = pd.read_sql_query(query, conn, params=(equipment_id,))
+    df = read_priority_features(conn, "WHERE e.equipment_id = ?", (equipment_id,))
     conn.close()
     
     if df.empty:
@@ -445,13 +660,13 @@ def get_equipment_metrics_only(equipment_id: str, user=Depends(get_current_user)
     features = df[["equipment_age", "downtime", "failures", "avg_response", "needs_maintenance_10_days"]]
     features.columns = ["equipment_age", "downtime_hours", "num_failures", "response_time_hours", "needs_maintenance_10_days"]
 
-    scaler = joblib.load(os.path.join(BASE_DIR, "saved_models", "multi_priority_scaler.pkl"))
+    scaler = model_registry.get("multi_priority_scaler.pkl")
     X_scaled = scaler.transform(features)
 
     def label(pred): return {0: "Low", 1: "Medium", 2: "High"}[pred]
     results = {}
     for mtype in ["preventive", "corrective", "replacement"]:
-        model = joblib.load(os.path.join(BASE_DIR, "saved_models", f"{mtype}_model.pkl"))
+        model = model_registry.get(f"{mtype}_model.pkl")
         pred = model.predict(X_scaled)[0]
         results[mtype] = label(pred)
 
@@ -577,32 +792,22 @@ def schedule_maintenance(
 @router.get("/combined/{equipment_id}")
 def get_combined_equipment_data(equipment_id: str, user=Depends(get_current_user)):
     from llm_engine import generate_llm_explanation
+    from generate_equipment_report import fetch_equipment_metrics_with_chart
     import base64, os
 
-    metrics = fetch_equipment_metrics(equipment_id)
+    metrics, png = fetch_equipment_metrics_with_chart(equipment_id)
 
     chart_path = metrics.get("chart_path")
-    if not os.path.exists(chart_path):
-        raise HTTPException(status_code=404, detail="Trend chart not found")
+    if not png:
+        # Only happens when the chart renderer is saturated or timed out
+        raise HTTPException(status_code=503, detail="Trend chart is being rendered, retry shortly",
+                            headers={"Retry-After": "5"})
 
-    with open(chart_path, "rb") as img_file:
-        base64_chart = base64.b64encode(img_file.read()).decode()
+    base64_chart = base64.b64encode(png).decode()
 
     # Priority prediction
     conn = get_db()
-    query = """
-    SELECT e.equipment_id, e.installation_date,
-           COALESCE(SUM(m.downtime_hours), 0) AS downtime,
-           COUNT(m.maintenance_id) AS failures,
-           COALESCE(AVG(m.response_time_hours), 0) AS avg_response,
-           COALESCE(f.needs_maintenance_10_days, 0) AS needs_maintenance_10_days
-    FROM equipment e
-    LEFT JOIN maintenance_logs m ON e.equipment_id = m.equipment_id
-    LEFT JOIN failure_predictions f ON e.equipment_id = f.equipment_id
-    WHERE e.equipment_id = ?
-    GROUP BY e.equipment_id
-    """
-    df = pd.read_sql_query(query, conn, params=(equipment_id,))
+    df = read_priority_features(conn, "WHERE e.equipment_id = ?", (equipment_id,))
     conn.close()
     if df.empty:
         raise HTTPException(status_code=404, detail="Equipment not found")
@@ -613,18 +818,18 @@ def get_combined_equipment_data(equipment_id: str, user=Depends(get_current_user
     features = df[["equipment_age", "downtime", "failures", "avg_response", "needs_maintenance_10_days"]]
     features.columns = ["equipment_age", "downtime_hours", "num_failures", "response_time_hours", "needs_maintenance_10_days"]
 
-    scaler = joblib.load(os.path.join(BASE_DIR, "saved_models", "multi_priority_scaler.pkl"))
+    scaler = model_registry.get("multi_priority_scaler.pkl")
     X_scaled = scaler.transform(features)
 
     def label(pred): return {0: "Low", 1: "Medium", 2: "High"}[pred]
     results = {}
     for mtype in ["preventive", "corrective", "replacement"]:
-        model = joblib.load(os.path.join(BASE_DIR, "saved_models", f"{mtype}_model.pkl"))
+        model = model_registry.get(f"{mtype}_model.pkl")
         pred = model.predict(X_scaled)[0]
         results[mtype] = label(pred)
 
     role = user["role"].lower()
-    explanation = generate_llm_explanation(metrics, role, chart_path)
+    explanation = generate_llm_explanation(metrics, role, chart_path, image_bytes=png)
 
     return {
         "equipment_id": equipment_id,
@@ -649,27 +854,55 @@ def get_all_equipment_health(user=Depends(get_current_user)):
 
     cursor.execute("SELECT equipment_id FROM equipment")
     ids = [row[0] for row in cursor.fetchall()]
+
+    # Fresh stored results are reused, as in /priority/{equipment_id}
+    stale = find_stale_priority_ids(cursor)
+    cursor.execute("""
+        SELECT equipment_id, predicted_to_fail, preventive, corrective, replacement
+        FROM maintenance_prediction_results
+    """)
+    details = {
+        row[0]: {
+            "predicted_to_fail": bool(row[1]),
+            "maintenance_needs": {"preventive": row[2], "corrective": row[3], "replacement": row[4]}
+        }
+        for row in cursor.fetchall()
+        if row[0] not in stale
+    }
     conn.close()
 
+    # Everything else is scored in a single batch
+    missing = [eid for eid in ids if eid not in details]
+    if missing:
+        try:
+            details.update(score_priority_batch(missing))
+        except Exception as e:
+            # One bad row fails the whole batch; score one by one and leave out failures
+            print(f"Batch priority scoring failed ({e}), scoring {len(missing)} equipment one by one")
+            for eid in missing:
+                try:
+                    details.update(score_priority_batch([eid]))
+                except Exception as e:
+                    print(f"Skipping {eid} in health status: {e}")
+
     results = []
     for eid in ids:
-        try:
-            detail = get_full_maintenance_priority(eid, user)
-            msg = []
-            if detail["predicted_to_fail"]:
-                msg.append("Likely to fail in 10 days")
-            for typ, level in detail["maintenance_needs"].items():
-                if level == "High":
-                    msg.append(f"{typ.capitalize()} maintenance needed")
-
-            if msg:
-                results.append({
-                    "equipment_id": eid,
-                    "health_status": "Attention Needed",
-                    "message": "; ".join(msg)
-                })
-        except:
+        detail = details.get(eid)
+        if detail is None:
             continue
+        msg = []
+        if detail["predicted_to_fail"]:
+            msg.append("Likely to fail in 10 days")
+        for typ, level in detail["maintenance_needs"].items():
+            if level == "High":
+                msg.append(f"{typ.capitalize()} maintenance needed")
+
+        if msg:
+            results.append({
+                "equipment_id": eid,
+                "health_status": "Attention Needed",
+                "message": "; ".join(msg)
+            })
 
     return {"health_status": results}
 
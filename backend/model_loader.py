@@ -0,0 +1,77 @@
+# backend/model_loader.py
+import os
+import threading
+import time
+
+# How long a prediction request waits for the warm-up before using the fallback
+MODEL_WAIT_SECONDS = float(os.getenv("MODEL_WAIT_SECONDS", "10"))
+
+
+class ModelLoader:
+    """
+    Loads a set of models on a background thread so the API can start serving
+    immediately. Each model is loaded by its own callable, in the order given;
+    a failed load is recorded and leaves that model as None.
+    """
+
+    def __init__(self, loaders):
+        self._loaders = dict(loaders)
+        self._models = {name: None for name in self._loaders}
+        self._state = {
+            name: {"status": "pending", "load_seconds": None, "error": None}
+            for name in self._loaders
+        }
+        self._lock = threading.Lock()
+        self._thread = None
+        self._done = threading.Event()
+        self._started_at = None
+        self._finished_at = None
+
+    def start(self):
+        """Start the warm-up thread (no-op if it is already running or finished)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._started_at = time.time()
+            self._thread = threading.Thread(target=self._warm_up, name="model-warmup", daemon=True)
+            self._thread.start()
+
+    def _warm_up(self):
+        for name, loader in self._loaders.items():
+            self._state[name]["status"] = "loading"
+            start = time.perf_counter()
+            try:
+                self._models[name] = loader()
+                self._state[name]["status"] = "loaded"
+                print(f"{name} model loaded successfully")
+            except Exception as e:
+                self._state[name]["status"] = "failed"
+                self._state[name]["error"] = str(e)
+                print(f"Warning: Could not load {name} model: {e}")
+            self._state[name]["load_seconds"] = round(time.perf_counter() - start, 3)
+
+        self._finished_at = time.time()
+        self._done.set()
+
+    def wait(self, timeout=MODEL_WAIT_SECONDS):
+        """Block until the warm-up finishes or `timeout` seconds pass; returns True if finished"""
+        self.start()
+        return self._done.wait(timeout)
+
+    @property
+    def ready(self):
+        return self._done.is_set()
+
+    def get(self, name):
+        """The loaded model, or None while loading / after a failed load"""
+        return self._models[name]
+
+    def status(self):
+        warmup_seconds = None
+        if self._started_at is not None:
+            warmup_seconds = round((self._finished_at or time.time()) - self._started_at, 3)
+        return {
+            "ready": self.ready,
+            "warmup_seconds": warmup_seconds,
+            "models": {name: dict(state) for name, state in self._state.items()},
+        }
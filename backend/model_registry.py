@@ -0,0 +1,118 @@
+# backend/model_registry.py
+import hashlib
+import os
+import threading
+import time
+
+import joblib
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "saved_models")
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class _Artifact:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.obj = None
+        self.stat = None
+        self.sha256 = None
+        self.loads = 0
+        self.hits = 0
+        self.last_load_seconds = None
+        self.total_load_seconds = 0.0
+        self.loaded_at = None
+        self.error = None
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of joblib artifacts in saved_models/.
+
+    Each file is unpickled once. Every get() compares the file's mtime and size
+    with the loaded copy; when they differ the content hash decides whether to
+    reload, so a touched-but-identical file is not unpickled again. A reload that
+    fails (e.g. a file caught mid-copy) keeps serving the previous object.
+    """
+
+    def __init__(self, models_dir=MODELS_DIR, loader=joblib.load):
+        self.models_dir = models_dir
+        self._loader = loader
+        self._artifacts = {}
+        self._lock = threading.Lock()
+
+    def _artifact(self, name):
+        with self._lock:
+            if name not in self._artifacts:
+                self._artifacts[name] = _Artifact()
+            return self._artifacts[name]
+
+    def get(self, name):
+        """The loaded object for saved_models/<name>, (re)loading it if the file changed"""
+        path = os.path.join(self.models_dir, name)
+        artifact = self._artifact(name)
+        st = os.stat(path)
+        stat = (st.st_mtime_ns, st.st_size)
+
+        if artifact.obj is not None and artifact.stat == stat:
+            artifact.hits += 1
+            return artifact.obj
+
+        with artifact.lock:
+            # Another request may have reloaded it while we waited
+            if artifact.obj is not None and artifact.stat == stat:
+                artifact.hits += 1
+                return artifact.obj
+
+            sha256 = _file_hash(path)
+            if artifact.obj is not None and artifact.sha256 == sha256:
+                artifact.stat = stat
+                artifact.hits += 1
+                return artifact.obj
+
+            start = time.perf_counter()
+            try:
+                obj = self._loader(path)
+            except Exception as e:
+                artifact.error = str(e)
+                if artifact.obj is None:
+                    raise
+                print(f"Warning: Could not reload {name}, keeping the loaded copy: {e}")
+                return artifact.obj
+
+            elapsed = time.perf_counter() - start
+            artifact.obj = obj
+            artifact.stat = stat
+            artifact.sha256 = sha256
+            artifact.loads += 1
+            artifact.last_load_seconds = round(elapsed, 4)
+            artifact.total_load_seconds += elapsed
+            artifact.loaded_at = time.strftime('%Y-%m-%d %H:%M:%S')
+            artifact.error = None
+            print(f"Loaded {name} in {elapsed:.3f}s (load #{artifact.loads})")
+            return obj
+
+    def stats(self):
+        with self._lock:
+            items = list(self._artifacts.items())
+        return {
+            name: {
+                "loads": a.loads,
+                "hits": a.hits,
+                "last_load_seconds": a.last_load_seconds,
+                "total_load_seconds": round(a.total_load_seconds, 4),
+                "loaded_at": a.loaded_at,
+                "sha256": a.sha256[:12] if a.sha256 else None,
+                "error": a.error,
+            }
+            for name, a in items
+        }
+
+
+model_registry = ModelRegistry()
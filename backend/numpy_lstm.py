@@ -0,0 +1,155 @@
+# backend/numpy_lstm.py
+"""
+Inference-only NumPy runtime for the Keras Sequential model in saved_models/lstm_model.h5.
+
+Reads the architecture and weights straight from the HDF5 file with h5py and
+runs the forward pass for a whole batch with matrix products, so serving does
+not need TensorFlow. Supports the layers the saved models use: LSTM,
+BatchNormalization, Dense and Dropout (identity at inference).
+"""
+import json
+
+import numpy as np
+
+ACTIVATIONS = {
+    "linear": lambda x: x,
+    "tanh": np.tanh,
+    "sigmoid": lambda x: 0.5 * (np.tanh(0.5 * x) + 1.0),
+    "relu": lambda x: np.maximum(x, 0.0),
+}
+
+
+def _activation(name):
+    if name not in ACTIVATIONS:
+        raise ValueError(f"Unsupported activation: {name}")
+    return ACTIVATIONS[name]
+
+
+def _layer_weights(weights_group, layer_name):
+    """Weights of one layer keyed by their short name (kernel, bias, gamma, ...)"""
+    group = weights_group[layer_name]
+    weights = {}
+    for weight_name in group.attrs.get("weight_names", []):
+        if isinstance(weight_name, bytes):
+            weight_name = weight_name.decode("utf-8")
+        short_name = weight_name.split("/")[-1].split(":")[0]
+        weights[short_name] = np.asarray(group[weight_name], dtype=np.float32)
+    return weights
+
+
+class LSTMLayer:
+    def __init__(self, config, weights):
+        if config.get("go_backwards") or config.get("stateful"):
+            raise ValueError("go_backwards / stateful LSTMs are not supported")
+        self.units = config["units"]
+        self.return_sequences = config.get("return_sequences", False)
+        self.activation = _activation(config.get("activation", "tanh"))
+        self.recurrent_activation = _activation(config.get("recurrent_activation", "sigmoid"))
+        self.kernel = weights["kernel"]
+        self.recurrent_kernel = weights["recurrent_kernel"]
+        self.bias = weights.get("bias", np.zeros(4 * self.units, dtype=np.float32))
+
+    def __call__(self, x):
+        batch, steps, _ = x.shape
+        units = self.units
+        h = np.zeros((batch, units), dtype=np.float32)
+        c = np.zeros((batch, units), dtype=np.float32)
+        # Input projection for every timestep at once; only the recurrence is sequential
+        x_proj = x @ self.kernel + self.bias
+        outputs = []
+        for t in range(steps):
+            z = x_proj[:, t, :] + h @ self.recurrent_kernel
+            # Keras gate order: input, forget, cell, output
+            i = self.recurrent_activation(z[:, :units])
+            f = self.recurrent_activation(z[:, units:2 * units])
+            g = self.activation(z[:, 2 * units:3 * units])
+            o = self.recurrent_activation(z[:, 3 * units:])
+            c = f * c + i * g
+            h = o * self.activation(c)
+            if self.return_sequences:
+                outputs.append(h)
+        return np.stack(outputs, axis=1) if self.return_sequences else h
+
+
+class BatchNormalizationLayer:
+    def __init__(self, config, weights):
+        axis = config.get("axis", -1)
+        if axis not in (-1, [-1]):
+            raise ValueError(f"Unsupported BatchNormalization axis: {axis}")
+        variance = weights["moving_variance"]
+        gamma = weights.get("gamma", np.ones_like(variance))
+        beta = weights.get("beta", np.zeros_like(variance))
+        # Fold the inference-time normalisation into one scale and shift
+        self.scale = gamma / np.sqrt(variance + np.float32(config.get("epsilon", 1e-3)))
+        self.shift = beta - weights["moving_mean"] * self.scale
+
+    def __call__(self, x):
+        return x * self.scale + self.shift
+
+
+class DenseLayer:
+    def __init__(self, config, weights):
+        self.activation = _activation(config.get("activation", "linear"))
+        self.kernel = weights["kernel"]
+        self.bias = weights.get("bias")
+
+    def __call__(self, x):
+        y = x @ self.kernel
+        if self.bias is not None:
+            y = y + self.bias
+        return self.activation(y)
+
+
+LAYERS = {
+    "LSTM": LSTMLayer,
+    "BatchNormalization": BatchNormalizationLayer,
+    "Dense": DenseLayer,
+}
+# Layers that do nothing at inference time
+PASSTHROUGH = {"InputLayer", "Dropout"}
+
+
+class NumpySequential:
+    """Drop-in for the Keras model's predict() on the serving path"""
+
+    engine = "numpy"
+
+    def __init__(self, layers):
+        self.layers = layers
+
+    def predict(self, X, **kwargs):
+        x = np.asarray(X, dtype=np.float32)
+        for layer in self.layers:
+            x = layer(x)
+        return x
+
+
+def load_keras_h5(path):
+    """Build a NumpySequential from a Keras .h5 file saved with model.save()"""
+    import h5py
+
+    with h5py.File(path, "r") as f:
+        model_config = f.attrs["model_config"]
+        if isinstance(model_config, bytes):
+            model_config = model_config.decode("utf-8")
+        model_config = json.loads(model_config)
+        if model_config["class_name"] != "Sequential":
+            raise ValueError(f"Only Sequential models are supported, got {model_config['class_name']}")
+
+        weights_group = f["model_weights"] if "model_weights" in f else f
+        layer_configs = model_config["config"]
+        # Older Keras versions store the layer list directly
+        if isinstance(layer_configs, dict):
+            layer_configs = layer_configs["layers"]
+
+        layers = []
+        for layer in layer_configs:
+            class_name = layer["class_name"]
+            if class_name in PASSTHROUGH:
+                continue
+            if class_name not in LAYERS:
+                raise ValueError(f"Unsupported layer type: {class_name}")
+            config = layer["config"]
+            layers.append(LAYERS[class_name](config, _layer_weights(weights_group, config["name"])))
+
+    return NumpySequential(layers)
@@ -1,5 +1,5 @@
 #backend/predict.py
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
 from dependencies import get_current_user
 import numpy as np
 import pandas as pd
@@ -7,128 +7,88 @@ import sqlite3
 import joblib
 import os
 from database import get_db
+from model_loader import ModelLoader
+from background_jobs import Job, JobManager
 from datetime import datetime, timedelta
+from typing import Literal
 
 router = APIRouter()
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# Safe model loading with error handling
-lstm_model = None
-lgbm_model = None
-scaler = None
+# LSTM inference engine: "numpy" runs the saved model with numpy_lstm (no TensorFlow),
+# "keras" loads it with TensorFlow, "auto" tries NumPy first and falls back to Keras
+LSTM_ENGINE = os.getenv("LSTM_ENGINE", "auto").lower()
+
+def _load_lstm():
+    path = os.path.join(BASE_DIR, "saved_models", "lstm_model.h5")
+    if LSTM_ENGINE in ("numpy", "auto"):
+        try:
+            from numpy_lstm import load_keras_h5
+            model = load_keras_h5(path)
+            print("LSTM running on the NumPy engine")
+            return model
+        except Exception as e:
+            if LSTM_ENGINE == "numpy":
+                raise
+            print(f"NumPy LSTM engine unavailable ({e}), loading with TensorFlow")
 
-try:
     from tensorflow.keras.models import load_model
-    lstm_model = load_model(os.path.join(BASE_DIR, "saved_models", "lstm_model.h5"))
-    print("LSTM model loaded successfully")
-except Exception as e:
-    print(f"Warning: Could not load LSTM model: {e}")
-    print("Will use fallback prediction method")
-
-try:
-    lgbm_model = joblib.load(os.path.join(BASE_DIR, "saved_models", "lgbm_model.pkl"))
-    print("LightGBM model loaded successfully")
-except Exception as e:
-    print(f"Warning: Could not load LightGBM model: {e}")
-
-try:
-    scaler = joblib.load(os.path.join(BASE_DIR, "saved_models", "scaler.pkl"))
-    print("Scaler loaded successfully")
-except Exception as e:
-    print(f"Warning: Could not load scaler: {e}")
+    return load_model(path)
+
+# Models load on a background thread started from main.py's lifespan, so the API
+# can serve /health and /login while TensorFlow initialises. Cheap models go first.
+prediction_models = ModelLoader({
+    "scaler": lambda: joblib.load(os.path.join(BASE_DIR, "saved_models", "scaler.pkl")),
+    "lgbm": lambda: joblib.load(os.path.join(BASE_DIR, "saved_models", "lgbm_model.pkl")),
+    "lstm": _load_lstm,
+})
+
+def loaded_models():
+    """
+    (lstm, lgbm, scaler) once the warm-up finished or MODEL_WAIT_SECONDS passed.
+    Models that are still loading or failed to load are None.
+    """
+    prediction_models.wait()
+    return prediction_models.get("lstm"), prediction_models.get("lgbm"), prediction_models.get("scaler")
+
+# Rule-based fallback, as data. Each feature's (threshold, score) pairs are
+# checked highest first and the first one exceeded wins, like an if/elif chain;
+# the winning scores are summed in table order.
+FALLBACK_RULES = [
+    ("usage_hours", [(8000, 0.3), (6000, 0.2)]),   # High usage hours indicate more wear
+    ("error_count", [(5, 0.4), (2, 0.2)]),         # High error count is concerning
+    ("avg_cpu_temp", [(75, 0.3), (65, 0.1)]),      # High CPU temperature indicates stress
+    ("workload_level", [(80, 0.2)]),               # High workload level
+]
+FALLBACK_MAX_PROBABILITY = 0.95
+FALLBACK_THRESHOLD = 0.4
 
 def fallback_prediction(features_df):
     """
     Simple rule-based prediction when ML models fail
-    Based on equipment health indicators
-    """
-    predictions = []
-    probabilities = []
-    
-    for _, row in features_df.iterrows():
-        # Simple rule-based logic
-        score = 0
-        
-        # High usage hours indicate more wear
-        if row['usage_hours'] > 8000:
-            score += 0.3
-        elif row['usage_hours'] > 6000:
-            score += 0.2
-        
-        # High error count is concerning
-        if row['error_count'] > 5:
-            score += 0.4
-        elif row['error_count'] > 2:
-            score += 0.2
-        
-        # High CPU temperature indicates stress
-        if row['avg_cpu_temp'] > 75:
-            score += 0.3
-        elif row['avg_cpu_temp'] > 65:
-            score += 0.1
-        
-        # High workload level
-        if row['workload_level'] > 80:
-            score += 0.2
-        
-        # Cap the score at 1.0
-        prob = min(score, 0.95)
-        pred = 1 if prob > 0.4 else 0
-        
-        predictions.append(pred)
-        probabilities.append(prob)
-    
-    return np.array(predictions), np.array(probabilities)
-
-def should_skip_prediction_update(equipment_id, cursor):
-    """
-    Check if equipment had recent maintenance completion and should not be overridden
-    """
-    # Check if maintenance was completed in the last 24 hours
-    yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
-    
-    cursor.execute("""
-        SELECT maintenance_id FROM maintenance_logs 
-        WHERE equipment_id = ? 
-        AND status = 'Completed' 
-        AND (completion_status = 'Confirmed' OR completion_status = 'Approved')
-        AND date >= ?
-        ORDER BY date DESC 
-        LIMIT 1
-    """, (equipment_id, yesterday))
-    
-    recent_maintenance = cursor.fetchone()
-    
-    if recent_maintenance:
-        print(f"Skipping prediction update for {equipment_id} - recent maintenance completed")
-        return True
-    
-    # Also check if the failure_predictions table was manually reset recently
-    cursor.execute("""
-        SELECT prediction_date, failure_probability FROM failure_predictions 
-        WHERE equipment_id = ? 
-        AND failure_probability = 0.1 
-        AND needs_maintenance_10_days = 0
-        ORDER BY prediction_date DESC 
-        LIMIT 1
-    """, (equipment_id,))
-    
-    recent_reset = cursor.fetchone()
-    if recent_reset:
-        reset_date = datetime.strptime(recent_reset[0], '%Y-%m-%d')
-        if (datetime.now() - reset_date).days < 1:  # Reset within last 24 hours
-            print(f"Skipping prediction update for {equipment_id} - recently reset after maintenance")
-            return True
-    
-    return False
+    Based on equipment health indicators, evaluated over the whole frame at once
+    """
+    score = np.zeros(len(features_df))
 
-@router.post("/", summary="Predict maintenance for all equipment")
-def predict_maintenance(user=Depends(get_current_user)):
-    conn = get_db()
-    cursor = conn.cursor()
+    for feature, thresholds in FALLBACK_RULES:
+        values = features_df[feature].to_numpy(dtype=float)
+        conditions = [values > threshold for threshold, _ in thresholds]
+        choices = [points for _, points in thresholds]
+        score = score + np.select(conditions, choices, default=0.0)
 
-    # Create table if it doesn't exist
+    # Cap the score
+    probabilities = np.minimum(score, FALLBACK_MAX_PROBABILITY)
+    predictions = (probabilities > FALLBACK_THRESHOLD).astype(int)
+    return predictions, probabilities
+
+FEATURES = ["usage_hours", "patients_served", "workload_level", "avg_cpu_temp", "error_count"]
+SEQUENCE_LENGTH = 5
+
+def ensure_prediction_schema(cursor):
+    """
+    Create the failure_predictions table and the usage_logs index the window query relies on
+    """
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS failure_predictions (
         prediction_id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -138,123 +98,411 @@ def predict_maintenance(user=Depends(get_current_user)):
         failure_probability REAL
     )
     """)
+    # One prediction per equipment, so writes can upsert on equipment_id.
+    # Older databases may hold duplicates; keep the newest before adding the constraint.
+    cursor.execute("""
+        SELECT 1 FROM sqlite_master
+        WHERE type = 'index' AND name = 'idx_failure_predictions_equipment'
+    """)
+    if cursor.fetchone() is None:
+        cursor.execute("""
+            DELETE FROM failure_predictions
+            WHERE prediction_id NOT IN (
+                SELECT MAX(prediction_id) FROM failure_predictions GROUP BY equipment_id
+            )
+        """)
+        cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_failure_predictions_equipment
+        ON failure_predictions (equipment_id)
+        """)
+    # Serves the recently-completed-maintenance half of load_skip_set()
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_maintenance_logs_status_date
+    ON maintenance_logs (status, date)
+    """)
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_usage_logs_equipment_timestamp
+    ON usage_logs (equipment_id, timestamp DESC)
+    """)
+    # High-water mark of the usage window each equipment was last scored on
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS prediction_watermarks (
+        equipment_id TEXT PRIMARY KEY,
+        last_usage_rowid INTEGER,
+        last_usage_timestamp TEXT,
+        window_rowids TEXT,
+        engine TEXT,
+        needs_maintenance_10_days INTEGER,
+        failure_probability REAL,
+        scored_at TEXT
+    )
+    """)
 
+def load_recent_usage(conn, window=SEQUENCE_LENGTH):
+    """
+    Load only the `window` most recent usage logs of every equipment.
+
+    The selection happens inside SQLite: a recursive skip-scan over
+    idx_usage_logs_equipment_timestamp enumerates the equipment ids, and a
+    correlated LIMIT picks each one's latest rows from the same index. Both
+    are index seeks, so the cost follows fleet size rather than total
+    usage_logs history (a ROW_NUMBER() window still visits every row).
+    """
     query = """
-    SELECT equipment_id, timestamp, usage_hours, patients_served, workload_level, avg_cpu_temp, error_count
-    FROM usage_logs
-    ORDER BY equipment_id, timestamp DESC
+    WITH RECURSIVE fleet(equipment_id) AS (
+        SELECT MIN(equipment_id) FROM usage_logs
+        UNION ALL
+        SELECT (SELECT MIN(equipment_id) FROM usage_logs WHERE equipment_id > fleet.equipment_id)
+        FROM fleet
+        WHERE fleet.equipment_id IS NOT NULL
+    )
+    SELECT u.rowid AS log_rowid, u.equipment_id, u.timestamp, u.usage_hours,
+           u.patients_served, u.workload_level, u.avg_cpu_temp, u.error_count
+    FROM fleet
+    JOIN usage_logs AS u ON u.rowid IN (
+        SELECT rowid FROM usage_logs
+        WHERE equipment_id = fleet.equipment_id
+        ORDER BY timestamp DESC
+        LIMIT ?
+    )
     """
-    df = pd.read_sql_query(query, conn)
+    df = pd.read_sql_query(query, conn, params=(window,))
     df["timestamp"] = pd.to_datetime(df["timestamp"])
-    df = df.sort_values(["equipment_id", "timestamp"], ascending=[True, False])
-    features = ["usage_hours", "patients_served", "workload_level", "avg_cpu_temp", "error_count"]
+    return df
 
-    equipment_ids = df["equipment_id"].unique()
-    sequences = []
-    equipment_map = []
+def build_sequence_windows(df, features=FEATURES, window=SEQUENCE_LENGTH):
+    """
+    Build the (n_equipment, window, n_features) model input in a single pass.
 
-    for eq_id in equipment_ids:
-        eq_data = df[df["equipment_id"] == eq_id]
-        if len(eq_data) >= 5:
-            recent_logs = eq_data.head(5).sort_values("timestamp")
-            sequences.append(recent_logs[features])
-            equipment_map.append(eq_id)
+    One stable sort plus a groupby rank keeps the `window` most recent logs of
+    every equipment; equipment with fewer logs are dropped. Each window is
+    returned oldest-first, matching the per-equipment loop it replaces.
+    Returns the tensor and the equipment ids in row order.
+    """
+    if df.empty:
+        return np.empty((0, window, len(features))), []
 
-    if not sequences:
-        return {"message": "Not enough data for any equipment."}
+    df = df.sort_values(["equipment_id", "timestamp"], ascending=[True, False], kind="mergesort")
+    rank = df.groupby("equipment_id", sort=False).cumcount()
+    recent = df[rank.to_numpy() < window]
+    sizes = recent.groupby("equipment_id", sort=False)["equipment_id"].transform("size")
+    recent = recent[sizes.to_numpy() == window]
 
-    # Try ML prediction first, fallback to rule-based if failed
-    prediction_method = "fallback"
-    
-    if lstm_model is not None and lgbm_model is not None and scaler is not None:
+    # Rows are newest-first inside each block of `window`; flip to oldest-first
+    X_seq = recent[features].to_numpy(dtype=float).reshape(-1, window, len(features))[:, ::-1, :]
+    equipment_map = recent["equipment_id"].to_numpy()[::window].tolist()
+    return np.ascontiguousarray(X_seq), equipment_map
+
+def score_sequences(X_seq):
+    """
+    Run the LSTM + LightGBM ensemble over the whole batch, falling back to the
+    rule-based predictor on the most recent reading when the models are unavailable.
+    Returns (predictions, probabilities, prediction_method).
+    """
+    global _ensemble_checked, _ensemble_error
+    lstm_model, lgbm_model, scaler = loaded_models()
+    if lstm_model is not None and lgbm_model is not None and scaler is not None and _ensemble_error is None:
         try:
-            # Original ML prediction logic
-            sequences_scaled = []
-            for seq_df in sequences:
-                X_scaled = scaler.transform(seq_df)
-                sequences_scaled.append(X_scaled)
-            
-            X_seq = np.array(sequences_scaled)
-            X_flat = X_seq.reshape(X_seq.shape[0], -1)
-
-            lstm_probs = lstm_model.predict(X_seq).flatten()
+            n_equipment, steps, n_features = X_seq.shape
+            X_scaled = scaler.transform(X_seq.reshape(-1, n_features)).reshape(n_equipment, steps, n_features)
+            X_flat = X_scaled.reshape(n_equipment, -1)
+
+            lstm_probs = lstm_model.predict(X_scaled).flatten()
             lgbm_probs = lgbm_model.predict_proba(X_flat)[:, 1]
             ensemble_probs = (lstm_probs + lgbm_probs) / 2
             ensemble_preds = (ensemble_probs > 0.4).astype(int)
-            prediction_method = "ml_ensemble"
-            
+            _ensemble_checked = True
+            return ensemble_preds, ensemble_probs, "ml_ensemble"
+
         except Exception as e:
+            # The models only load once per process, so the failure sticks until a restart
+            _ensemble_checked, _ensemble_error = True, str(e)
             print(f"ML prediction failed: {e}")
             print("Falling back to rule-based prediction")
-            # Use the most recent data for each equipment
-            latest_data = []
-            for seq_df in sequences:
-                latest_data.append(seq_df.iloc[-1])  # Most recent entry
-            
-            features_df = pd.DataFrame(latest_data)
-            ensemble_preds, ensemble_probs = fallback_prediction(features_df)
-    else:
-        # Use rule-based prediction
-        latest_data = []
-        for seq_df in sequences:
-            latest_data.append(seq_df.iloc[-1])  # Most recent entry
-        
-        features_df = pd.DataFrame(latest_data)
-        ensemble_preds, ensemble_probs = fallback_prediction(features_df)
 
-    today = pd.Timestamp.today().strftime('%Y-%m-%d')
-    results = []
-    skipped_count = 0
+    # Use the most recent entry of each window
+    features_df = pd.DataFrame(X_seq[:, -1, :], columns=FEATURES)
+    ensemble_preds, ensemble_probs = fallback_prediction(features_df)
+    return ensemble_preds, ensemble_probs, "fallback"
 
-    for eid, pred, prob in zip(equipment_map, ensemble_preds, ensemble_probs):
-        # Check if we should skip updating this equipment's prediction
-        if should_skip_prediction_update(eid, cursor):
-            skipped_count += 1
-            # Get current values for reporting
-            cursor.execute("""
-                SELECT needs_maintenance_10_days, failure_probability 
-                FROM failure_predictions 
-                WHERE equipment_id = ?
-            """, (eid,))
-            current = cursor.fetchone()
-            if current:
+# Whether the ensemble has run on the loaded models, and its error if it failed
+_ensemble_checked = False
+_ensemble_error = None
+
+def current_engine():
+    """
+    Name of the engine score_sequences() will use; a change invalidates cached scores.
+    Loaded models can still fail at inference (e.g. a feature-count mismatch), so the
+    first call scores one dummy window to find out.
+    """
+    if any(model is None for model in loaded_models()):
+        return "fallback"
+    if not _ensemble_checked:
+        score_sequences(np.zeros((1, SEQUENCE_LENGTH, len(FEATURES))))
+    return "fallback" if _ensemble_error else "ml_ensemble"
+
+def window_signatures(df):
+    """
+    Map equipment_id -> (last rowid, last timestamp, rowids) of its current usage window
+    """
+    if df.empty:
+        return {}
+    grouped = df.sort_values("log_rowid").groupby("equipment_id", sort=False)
+    last_rowid = grouped["log_rowid"].max()
+    last_timestamp = grouped["timestamp"].max().astype(str)
+    rowids = grouped["log_rowid"].agg(lambda s: ",".join(map(str, s)))
+    return {
+        eid: (int(last_rowid[eid]), last_timestamp[eid], rowids[eid])
+        for eid in last_rowid.index
+    }
+
+def find_stale_equipment(cursor, equipment_map, signatures, engine):
+    """
+    Return the equipment whose usage window, scoring engine or stored prediction
+    changed since they were last scored. Everything else can reuse its cached result.
+    """
+    cursor.execute("""
+        SELECT w.equipment_id, w.window_rowids, w.engine,
+               w.needs_maintenance_10_days, w.failure_probability,
+               f.needs_maintenance_10_days, f.failure_probability
+        FROM prediction_watermarks w
+        JOIN failure_predictions f ON f.equipment_id = w.equipment_id
+    """)
+    fresh = set()
+    for eid, rowids, scored_engine, wm_pred, wm_prob, fp_pred, fp_prob in cursor.fetchall():
+        # A prediction rewritten elsewhere (e.g. a post-maintenance reset) no longer
+        # matches the watermark and has to go back through the skip rules. Scores from
+        # another engine (a fallback while the models were down) are redone as well.
+        if (eid in signatures and rowids == signatures[eid][2] and scored_engine == engine
+                and wm_pred == fp_pred and wm_prob == fp_prob):
+            fresh.add(eid)
+    return [eid for eid in equipment_map if eid not in fresh]
+
+def load_cached_predictions(cursor, equipment_ids):
+    """
+    Current failure_predictions rows for the given equipment, keyed by equipment_id
+    """
+    if not equipment_ids:
+        return {}
+    wanted = set(equipment_ids)
+    cursor.execute("""
+        SELECT equipment_id, needs_maintenance_10_days, failure_probability
+        FROM failure_predictions
+        ORDER BY prediction_id
+    """)
+    return {row[0]: row[1:] for row in cursor.fetchall() if row[0] in wanted}
+
+def record_watermarks(cursor, rows, signatures, engine):
+    """
+    Store the scored window and written values for (equipment_id, pred, prob) rows
+    """
+    scored_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    cursor.executemany("""
+        INSERT INTO prediction_watermarks (
+            equipment_id, last_usage_rowid, last_usage_timestamp, window_rowids,
+            engine, needs_maintenance_10_days, failure_probability, scored_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(equipment_id) DO UPDATE SET
+            last_usage_rowid = excluded.last_usage_rowid,
+            last_usage_timestamp = excluded.last_usage_timestamp,
+            window_rowids = excluded.window_rowids,
+            engine = excluded.engine,
+            needs_maintenance_10_days = excluded.needs_maintenance_10_days,
+            failure_probability = excluded.failure_probability,
+            scored_at = excluded.scored_at
+    """, [(eid, *signatures[eid], engine, pred, prob, scored_at) for eid, pred, prob in rows])
+
+def load_skip_set(cursor):
+    """
+    Equipment whose prediction must not be overridden: maintenance confirmed or
+    approved in the last 24 hours, or a post-maintenance reset written today.
+    """
+    yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
+    today = datetime.now().strftime('%Y-%m-%d')
+
+    cursor.execute("""
+        SELECT equipment_id FROM maintenance_logs
+        WHERE status = 'Completed'
+        AND (completion_status = 'Confirmed' OR completion_status = 'Approved')
+        AND date >= ?
+        UNION
+        SELECT equipment_id FROM failure_predictions
+        WHERE failure_probability = 0.1
+        AND needs_maintenance_10_days = 0
+        AND prediction_date >= ?
+    """, (yesterday, today))
+    return {row[0] for row in cursor.fetchall()}
+
+def write_predictions(cursor, rows, prediction_date):
+    """
+    Upsert (equipment_id, pred, prob) rows into failure_predictions in one statement
+    """
+    cursor.executemany("""
+        INSERT INTO failure_predictions (equipment_id, prediction_date, needs_maintenance_10_days, failure_probability)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(equipment_id) DO UPDATE SET
+            prediction_date = excluded.prediction_date,
+            needs_maintenance_10_days = excluded.needs_maintenance_10_days,
+            failure_probability = excluded.failure_probability
+    """, [(eid, prediction_date, pred, prob) for eid, pred, prob in rows])
+
+PREDICTION_STAGES = ("load_windows", "inference", "write")
+
+def score_fleet(conn, mode="incremental", job=None):
+    """
+    Load usage windows from `conn` and score the equipment that need it
+    ("incremental": changed windows only, "full": everything).
+
+    Returns (equipment_map, signatures, engine, scored, prediction_method); scored maps
+    equipment_id -> (pred, prob) and engine names what produced them, which is "fallback"
+    when inference failed on loaded models. equipment_map is empty when no equipment has
+    enough data.
+    """
+    job = job or Job("predict", len(PREDICTION_STAGES))
+    cursor = conn.cursor()
+
+    with job.stage("load_windows"):
+        # Create table and indexes if they don't exist
+        ensure_prediction_schema(cursor)
+
+        df = load_recent_usage(conn)
+        X_seq, equipment_map = build_sequence_windows(df)
+
+    if not equipment_map:
+        return equipment_map, {}, None, {}, None
+
+    with job.stage("inference"):
+        signatures = window_signatures(df)
+        engine = current_engine()
+        if mode == "incremental":
+            stale_ids = find_stale_equipment(cursor, equipment_map, signatures, engine)
+        else:
+            stale_ids = list(equipment_map)
+        job.set_progress({"equipment": len(equipment_map), "to_score": len(stale_ids)})
+
+        # Try ML prediction first, fallback to rule-based if failed
+        prediction_method = "cached"
+        scored = {}
+        if stale_ids:
+            stale_set = set(stale_ids)
+            stale_idx = [i for i, eid in enumerate(equipment_map) if eid in stale_set]
+            ensemble_preds, ensemble_probs, prediction_method = score_sequences(X_seq[stale_idx])
+            scored = dict(zip(stale_ids, zip(ensemble_preds, ensemble_probs)))
+            engine = prediction_method
+
+    return equipment_map, signatures, engine, scored, prediction_method
+
+def run_prediction(mode="incremental", job=None):
+    """
+    The /predict pipeline: load usage windows, score the equipment that need it,
+    write predictions. `job` (background_jobs.Job) receives per-stage timings.
+    """
+    job = job or Job("predict", len(PREDICTION_STAGES))
+    conn = get_db()
+    try:
+        cursor = conn.cursor()
+        equipment_map, signatures, engine, scored, prediction_method = score_fleet(conn, mode, job)
+
+        if not equipment_map:
+            return {"message": "Not enough data for any equipment."}
+
+        with job.stage("write"):
+            skip_set = load_skip_set(cursor) & scored.keys()
+            if skip_set:
+                print(f"Skipping prediction update for {len(skip_set)} equipment - recent maintenance completed or reset")
+            cached = load_cached_predictions(cursor, [eid for eid in equipment_map if eid not in scored or eid in skip_set])
+
+            today = pd.Timestamp.today().strftime('%Y-%m-%d')
+            results = []
+            written = []
+
+            for eid in equipment_map:
+                if eid not in scored or eid in skip_set:
+                    current = cached.get(eid)
+                    if current:
+                        results.append({
+                            "equipment_id": eid,
+                            "maintenance_needed": current[0],
+                            "confidence_score": round(float(current[1]), 4),
+                            "status": "unchanged" if eid not in scored else "preserved_post_maintenance"
+                        })
+                    continue
+
+                pred, prob = scored[eid]
+                written.append((eid, int(pred), float(round(prob, 4))))
                 results.append({
                     "equipment_id": eid,
-                    "maintenance_needed": current[0],
-                    "confidence_score": round(float(current[1]), 4),
-                    "status": "preserved_post_maintenance"
+                    "maintenance_needed": int(pred),
+                    "confidence_score": round(float(prob), 4),
+                    "status": "updated"
                 })
-            continue
-        
-        # Delete existing prediction for the equipment if any (overwrite behavior)
-        cursor.execute("DELETE FROM failure_predictions WHERE equipment_id = ?", (eid,))
-        
-        # Insert new prediction
-        cursor.execute("""
-            INSERT INTO failure_predictions (equipment_id, prediction_date, needs_maintenance_10_days, failure_probability)
-            VALUES (?, ?, ?, ?)
-        """, (eid, today, int(pred), float(round(prob, 4))))
 
-        results.append({
-            "equipment_id": eid,
-            "maintenance_needed": int(pred),
-            "confidence_score": round(float(prob), 4),
-            "status": "updated"
-        })
+            write_predictions(cursor, written, today)
+            # Preserved equipment keep no watermark so they are re-scored once the skip window passes.
+            # Rows carry the engine that actually scored them, so fallback scores are redone
+            # once the models work again.
+            record_watermarks(cursor, written, signatures, prediction_method)
+
+            conn.commit()
+    finally:
+        conn.close()
 
-    conn.commit()
-    conn.close()
-    
     return {
         "predictions": results,
         "prediction_method": prediction_method,
+        "mode": mode,
         "summary": {
             "total_equipment": len(equipment_map),
-            "updated": len(equipment_map) - skipped_count,
-            "preserved_post_maintenance": skipped_count
+            "updated": len(written),
+            "preserved_post_maintenance": len(skip_set),
+            "rescored": len(scored),
+            "skipped_unchanged": len(equipment_map) - len(scored)
         }
     }
 
+def _run_prediction_job(job, mode):
+    result = run_prediction(mode, job)
+    # The job keeps the summary; per-equipment rows are in failure_predictions
+    return {key: value for key, value in result.items() if key != "predictions"}
+
+# Background prediction runs; one worker, so runs never overlap
+prediction_jobs = JobManager("predict", max_workers=1)
+
+def submit_prediction_job(mode="incremental"):
+    """Start a background /predict run, or join the one already queued/running for `mode`"""
+    return prediction_jobs.submit(
+        _run_prediction_job, mode,
+        coalesce_key=f"predict:{mode}",
+        total_stages=len(PREDICTION_STAGES),
+    )
+
+@router.post("/", summary="Predict maintenance for all equipment")
+def predict_maintenance(
+    mode: Literal["incremental", "full"] = Query("incremental", description="'incremental' only re-scores equipment whose usage window changed"),
+    user=Depends(get_current_user)
+):
+    return run_prediction(mode)
+
+@router.post("/jobs", status_code=202, summary="Start a background prediction run for all equipment")
+def start_prediction_job(
+    mode: Literal["incremental", "full"] = Query("incremental", description="'incremental' only re-scores equipment whose usage window changed"),
+    user=Depends(get_current_user)
+):
+    job, created = submit_prediction_job(mode)
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "coalesced": not created,
+        "status_url": f"/predict/jobs/{job.id}"
+    }
+
+@router.get("/jobs/{job_id}", summary="Status, stage timings and summary of a background prediction run")
+def get_prediction_job(job_id: str, user=Depends(get_current_user)):
+    job = prediction_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Prediction job not found")
+    return job.to_dict()
+
 @router.post("/force-update", summary="Force predict maintenance for all equipment (override post-maintenance resets)")
 def force_predict_maintenance(user=Depends(get_current_user)):
     """
@@ -264,98 +512,34 @@ def force_predict_maintenance(user=Depends(get_current_user)):
     conn = get_db()
     cursor = conn.cursor()
 
-    # Create table if it doesn't exist
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS failure_predictions (
-        prediction_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        equipment_id TEXT,
-        prediction_date TEXT,
-        needs_maintenance_10_days INTEGER,
-        failure_probability REAL
-    )
-    """)
-
-    query = """
-    SELECT equipment_id, timestamp, usage_hours, patients_served, workload_level, avg_cpu_temp, error_count
-    FROM usage_logs
-    ORDER BY equipment_id, timestamp DESC
-    """
-    df = pd.read_sql_query(query, conn)
-    df["timestamp"] = pd.to_datetime(df["timestamp"])
-    df = df.sort_values(["equipment_id", "timestamp"], ascending=[True, False])
-    features = ["usage_hours", "patients_served", "workload_level", "avg_cpu_temp", "error_count"]
-
-    equipment_ids = df["equipment_id"].unique()
-    sequences = []
-    equipment_map = []
+    # Create table and indexes if they don't exist
+    ensure_prediction_schema(cursor)
 
-    for eq_id in equipment_ids:
-        eq_data = df[df["equipment_id"] == eq_id]
-        if len(eq_data) >= 5:
-            recent_logs = eq_data.head(5).sort_values("timestamp")
-            sequences.append(recent_logs[features])
-            equipment_map.append(eq_id)
+    df = load_recent_usage(conn)
+    X_seq, equipment_map = build_sequence_windows(df)
 
-    if not sequences:
+    if not equipment_map:
         return {"message": "Not enough data for any equipment."}
 
     # Try ML prediction first, fallback to rule-based if failed
-    prediction_method = "fallback"
-    
-    if lstm_model is not None and lgbm_model is not None and scaler is not None:
-        try:
-            # Original ML prediction logic
-            sequences_scaled = []
-            for seq_df in sequences:
-                X_scaled = scaler.transform(seq_df)
-                sequences_scaled.append(X_scaled)
-            
-            X_seq = np.array(sequences_scaled)
-            X_flat = X_seq.reshape(X_seq.shape[0], -1)
-
-            lstm_probs = lstm_model.predict(X_seq).flatten()
-            lgbm_probs = lgbm_model.predict_proba(X_flat)[:, 1]
-            ensemble_probs = (lstm_probs + lgbm_probs) / 2
-            ensemble_preds = (ensemble_probs > 0.4).astype(int)
-            prediction_method = "ml_ensemble"
-            
-        except Exception as e:
-            print(f"ML prediction failed: {e}")
-            print("Falling back to rule-based prediction")
-            # Use the most recent data for each equipment
-            latest_data = []
-            for seq_df in sequences:
-                latest_data.append(seq_df.iloc[-1])  # Most recent entry
-            
-            features_df = pd.DataFrame(latest_data)
-            ensemble_preds, ensemble_probs = fallback_prediction(features_df)
-    else:
-        # Use rule-based prediction
-        latest_data = []
-        for seq_df in sequences:
-            latest_data.append(seq_df.iloc[-1])  # Most recent entry
-        
-        features_df = pd.DataFrame(latest_data)
-        ensemble_preds, ensemble_probs = fallback_prediction(features_df)
+    ensemble_preds, ensemble_probs, prediction_method = score_sequences(X_seq)
 
     today = pd.Timestamp.today().strftime('%Y-%m-%d')
     results = []
+    written = []
 
     for eid, pred, prob in zip(equipment_map, ensemble_preds, ensemble_probs):
-        # Force delete and insert (original behavior)
-        cursor.execute("DELETE FROM failure_predictions WHERE equipment_id = ?", (eid,))
-        
-        cursor.execute("""
-            INSERT INTO failure_predictions (equipment_id, prediction_date, needs_maintenance_10_days, failure_probability)
-            VALUES (?, ?, ?, ?)
-        """, (eid, today, int(pred), float(round(prob, 4))))
-
+        written.append((eid, int(pred), float(round(prob, 4))))
         results.append({
             "equipment_id": eid,
             "maintenance_needed": int(pred),
             "confidence_score": round(float(prob), 4)
         })
 
+    # Force overwrite (original behavior)
+    write_predictions(cursor, written, today)
+    record_watermarks(cursor, written, window_signatures(df), prediction_method)
+
     conn.commit()
     conn.close()
     return {
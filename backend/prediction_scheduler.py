@@ -0,0 +1,164 @@
+# backend/prediction_scheduler.py
+import os
+import socket
+import threading
+import time
+import uuid
+
+from background_jobs import JobManager
+from database import get_db
+from predict import prediction_models, submit_prediction_job
+from maintenance import refresh_stale_priorities
+
+SCHEDULER_ENABLED = os.getenv("PREDICTION_SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes")
+# Full incremental re-score at least this often
+INTERVAL_SECONDS = float(os.getenv("PREDICTION_INTERVAL_MINUTES", "30")) * 60
+# How often to look for new usage data (and renew the lock)
+POLL_SECONDS = float(os.getenv("PREDICTION_POLL_SECONDS", "60"))
+# A lock not renewed for this long is considered abandoned by a dead worker
+LEASE_SECONDS = POLL_SECONDS * 3
+
+LEASE_NAME = "prediction_scheduler"
+
+
+def _run_priority_refresh_job(job):
+    return {"equipment": refresh_stale_priorities()}
+
+# Priority refreshes run here rather than on the scheduler thread, which has to keep
+# renewing the lease; one worker, so refreshes never overlap
+priority_refresh_jobs = JobManager("priority_refresh", max_workers=1)
+
+
+def ensure_scheduler_schema(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS scheduler_leases (
+        name TEXT PRIMARY KEY,
+        owner TEXT,
+        expires_at REAL
+    )
+    """)
+
+
+class PredictionScheduler:
+    """
+    Re-scores the fleet in the background: every INTERVAL_SECONDS, and soon
+    after new usage_logs rows appear. Runs go through the /predict job queue,
+    so they coalesce with user-triggered runs. Each tick also recomputes
+    maintenance priorities that were invalidated or expired. Nothing runs until the
+    prediction models finished warming up, so startup doesn't score with the fallback.
+
+    Each uvicorn worker starts a scheduler, but only the one holding the
+    lease row in scheduler_leases does any work; the others keep polling and
+    take over if the holder stops renewing it.
+    """
+
+    def __init__(self):
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._stop = threading.Event()
+        self._thread = None
+        self._is_leader = False
+        self._last_run = None
+        self._last_run_reason = None
+        self._last_job_id = None
+        self._last_signature = None
+        self._last_priority_job = None
+
+    def start(self):
+        if not SCHEDULER_ENABLED or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="prediction-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._release_lease()
+
+    def _acquire_lease(self, cursor):
+        now = time.time()
+        cursor.execute("""
+            INSERT INTO scheduler_leases (name, owner, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET
+                owner = excluded.owner,
+                expires_at = excluded.expires_at
+            WHERE scheduler_leases.owner = excluded.owner
+               OR scheduler_leases.expires_at < ?
+        """, (LEASE_NAME, self.owner, now + LEASE_SECONDS, now))
+        cursor.execute("SELECT owner FROM scheduler_leases WHERE name = ?", (LEASE_NAME,))
+        row = cursor.fetchone()
+        return row is not None and row[0] == self.owner
+
+    def _release_lease(self):
+        if not self._is_leader:
+            return
+        conn = get_db()
+        try:
+            conn.execute("DELETE FROM scheduler_leases WHERE name = ? AND owner = ?", (LEASE_NAME, self.owner))
+            conn.commit()
+        finally:
+            conn.close()
+        self._is_leader = False
+
+    def _usage_signature(self, cursor):
+        # MAX(rowid) is a single b-tree seek, so polling never scans usage history
+        cursor.execute("SELECT MAX(rowid) FROM usage_logs")
+        return cursor.fetchone()[0]
+
+    def _tick(self):
+        if not prediction_models.ready:
+            return
+        conn = get_db()
+        try:
+            cursor = conn.cursor()
+            ensure_scheduler_schema(cursor)
+            self._is_leader = self._acquire_lease(cursor)
+            conn.commit()
+            if not self._is_leader:
+                return
+
+            signature = self._usage_signature(cursor)
+        finally:
+            conn.close()
+
+        reason = None
+        if self._last_run is None or time.time() - self._last_run >= INTERVAL_SECONDS:
+            reason = "interval"
+        elif signature != self._last_signature:
+            reason = "new_usage_data"
+
+        if reason:
+            job, _ = submit_prediction_job("incremental")
+            self._last_run = time.time()
+            self._last_run_reason = reason
+            self._last_job_id = job.id
+            self._last_signature = signature
+            print(f"Scheduled prediction run ({reason}): job {job.id}")
+
+        self._last_priority_job, _ = priority_refresh_jobs.submit(
+            _run_priority_refresh_job, coalesce_key="priority_refresh"
+        )
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self._tick()
+            except Exception as e:
+                print(f"Prediction scheduler tick failed: {e}")
+            self._stop.wait(POLL_SECONDS)
+
+    def status(self):
+        return {
+            "enabled": SCHEDULER_ENABLED,
+            "leader": self._is_leader,
+            "owner": self.owner,
+            "interval_seconds": INTERVAL_SECONDS,
+            "poll_seconds": POLL_SECONDS,
+            "last_run_at": time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self._last_run)) if self._last_run else None,
+            "last_run_reason": self._last_run_reason,
+            "last_job_id": self._last_job_id,
+            "last_priority_refresh": self._last_priority_job.to_dict() if self._last_priority_job else None,
+        }
+
+
+prediction_scheduler = PredictionScheduler()
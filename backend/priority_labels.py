@@ -0,0 +1,75 @@
+# backend/priority_labels.py
+import os
+import threading
+
+import pandas as pd
+
+# Maintenance type -> (labeled CSV, label used when the file or the equipment row is missing)
+LABEL_FILES = {
+    "preventive": ("labeled_preventive_data.csv", "Medium"),
+    "corrective": ("labeled_corrective_data.csv", "Medium"),
+    "replacement": ("labeled_replacement_data.csv", "Low"),
+}
+
+
+class PriorityLabelIndex:
+    """
+    equipment_id -> label lookups over the labeled priority CSVs.
+
+    Each file is parsed once into a dict and parsed again only when its mtime or
+    size changes. A missing file, equipment or label falls back to the type's default
+    label; a file that fails to parse after a change (e.g. caught mid-write) keeps
+    serving the previous index.
+    """
+
+    def __init__(self, files=LABEL_FILES):
+        self.files = files
+        self._indexes = {}  # mtype -> (stat, {equipment_id: label})
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def _index(self, mtype):
+        path, _ = self.files[mtype]
+        try:
+            st = os.stat(path)
+            stat = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            return {}
+
+        cached = self._indexes.get(mtype)
+        if cached is not None and cached[0] == stat:
+            return cached[1]
+
+        with self._lock:
+            cached = self._indexes.get(mtype)
+            if cached is not None and cached[0] == stat:
+                return cached[1]
+            column = f"{mtype}_label"
+            try:
+                df = pd.read_csv(path)
+                if column in df:
+                    # Unlabeled rows fall back to the default instead of becoming a "nan" label
+                    df = df.dropna(subset=["equipment_id", column])
+                    index = dict(zip(df["equipment_id"], df[column].astype(str)))
+                else:
+                    index = {}
+            except FileNotFoundError:
+                return {}
+            except Exception as e:
+                if cached is None:
+                    raise
+                print(f"Warning: Could not reload {path}, keeping the loaded labels: {e}")
+                return cached[1]
+            self._indexes[mtype] = (stat, index)
+            self.loads += 1
+            return index
+
+    def labels(self, equipment_id):
+        """(preventive, corrective, replacement) labels for one equipment"""
+        return tuple(
+            self._index(mtype).get(equipment_id, default)
+            for mtype, (_, default) in self.files.items()
+        )
+
+
+priority_labels = PriorityLabelIndex()
@@ -0,0 +1,194 @@
+# backend/render_pool.py
+import asyncio
+import importlib
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+# Worker processes for matplotlib rendering; 0 renders in the calling thread (CLI scripts, tests)
+CHART_RENDER_WORKERS = int(os.getenv("CHART_RENDER_WORKERS", "2"))
+# Distinct renders allowed in flight (running + waiting) before new ones are turned away
+CHART_RENDER_QUEUE_MAX = int(os.getenv("CHART_RENDER_QUEUE_MAX", "8"))
+# How long a request waits for its render
+CHART_RENDER_TIMEOUT_SECONDS = float(os.getenv("CHART_RENDER_TIMEOUT_SECONDS", "60"))
+
+
+class RenderUnavailable(RuntimeError):
+    """The render was not produced in time; callers serve the page without the chart"""
+
+
+class RenderQueueFull(RenderUnavailable):
+    pass
+
+
+class RenderTimeout(RenderUnavailable):
+    pass
+
+
+def _resolve(target):
+    """A callable, or a "module:function" string imported in the worker"""
+    if isinstance(target, str):
+        module, name = target.split(":")
+        return getattr(importlib.import_module(module), name)
+    return target
+
+
+def _timed_call(target, args):
+    start = time.perf_counter()
+    result = _resolve(target)(*args)
+    return result, time.perf_counter() - start
+
+
+def _target_name(target):
+    return target if isinstance(target, str) else f"{target.__module__}:{target.__name__}"
+
+
+class RenderPool:
+    """
+    Chart rendering in worker processes, so matplotlib's CPU time and GIL hold stay out
+    of the API's request threads.
+
+    Renders are keyed by the caller (e.g. the cache path of the chart); a request for a
+    key that is already in flight waits on the same render instead of starting another.
+    At most max_pending distinct renders are in flight; beyond that render() raises
+    RenderQueueFull straight away. A caller that waits longer than timeout gets
+    RenderTimeout; the worker still finishes that render, and later requests for the
+    same key keep joining it until it does.
+    """
+
+    def __init__(self, workers=CHART_RENDER_WORKERS, max_pending=CHART_RENDER_QUEUE_MAX,
+                 timeout=CHART_RENDER_TIMEOUT_SECONDS):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor = None
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.deduplicated = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.failed = 0
+        self._renders = {}
+
+    def _pool(self):
+        if self._executor is None:
+            # spawn: forking a process that runs the scheduler and loader threads can
+            # copy a lock mid-acquire into the child
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def _record(self, name, seconds):
+        """Caller holds self._lock"""
+        entry = self._renders.setdefault(name, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+        entry["count"] += 1
+        entry["total_seconds"] += seconds
+        entry["max_seconds"] = max(entry["max_seconds"], seconds)
+        entry["last_seconds"] = seconds
+
+    def _finished(self, key, name, future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+            if future.cancelled() or future.exception() is not None:
+                self.failed += 1
+            else:
+                self._record(name, future.result()[1])
+
+    def submit(self, key, target, *args):
+        """Future of (result, render_seconds) for `key`, joining an in-flight render if there is one"""
+        name = _target_name(target)
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.deduplicated += 1
+                return future
+            if len(self._inflight) >= self.max_pending:
+                self.rejected += 1
+                raise RenderQueueFull(f"{len(self._inflight)} chart renders already in flight")
+            try:
+                future = self._pool().submit(_timed_call, target, args)
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for memory); start a fresh pool
+                self._executor = None
+                future = self._pool().submit(_timed_call, target, args)
+            self._inflight[key] = future
+            self.submitted += 1
+        future.add_done_callback(lambda f: self._finished(key, name, f))
+        return future
+
+    def render(self, key, target, *args):
+        """Blocking render for request threads; returns whatever the target returns"""
+        if self.workers <= 0:
+            try:
+                result, seconds = _timed_call(target, args)
+            except Exception:
+                with self._lock:
+                    self.failed += 1
+                raise
+            with self._lock:
+                self.submitted += 1
+                self._record(_target_name(target), seconds)
+            return result
+        future = self.submit(key, target, *args)
+        try:
+            return future.result(timeout=self.timeout)[0]
+        except FutureTimeout:
+            with self._lock:
+                self.timeouts += 1
+            raise RenderTimeout(f"Chart render {key} took longer than {self.timeout:.0f}s")
+
+    async def render_async(self, key, target, *args):
+        """render() for async routes; the event loop is free while the worker draws"""
+        if self.workers <= 0:
+            return await asyncio.to_thread(self.render, key, target, *args)
+        future = self.submit(key, target, *args)
+        try:
+            # shield: a request that gives up must not cancel a render others joined
+            result = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), self.timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            raise RenderTimeout(f"Chart render {key} took longer than {self.timeout:.0f}s")
+        return result[0]
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            in_flight = len(self._inflight)
+            running = sum(1 for f in self._inflight.values() if f.running())
+            renders = {
+                name: {
+                    "count": r["count"],
+                    "avg_seconds": round(r["total_seconds"] / r["count"], 4),
+                    "max_seconds": round(r["max_seconds"], 4),
+                    "last_seconds": round(r["last_seconds"], 4),
+                }
+                for name, r in self._renders.items()
+            }
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "timeout_seconds": self.timeout,
+                "in_flight": in_flight,
+                "queue_depth": in_flight - running,
+                "submitted": self.submitted,
+                "deduplicated": self.deduplicated,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "failed": self.failed,
+                "renders": renders,
+            }
+
+
+render_pool = RenderPool()
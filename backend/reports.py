@@ -0,0 +1,52 @@
+# backend/reports.py
+import os
+
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import FileResponse
+
+from background_jobs import JobManager
+from dependencies import require_role
+from fleet_report import run_fleet_report, REPORT_STAGES
+
+router = APIRouter()
+
+fleet_report_jobs = JobManager("fleet_report", max_workers=1)
+
+
+@router.post("/fleet", status_code=202, summary="Start generating report bundles for every equipment")
+def start_fleet_report(
+    pdf: bool = Query(False, description="Also build a one-page-per-equipment PDF"),
+    user=Depends(require_role("admin"))
+):
+    job, created = fleet_report_jobs.submit(
+        run_fleet_report, pdf=pdf, archive=True,
+        coalesce_key="fleet_report",
+        total_stages=len(REPORT_STAGES),
+    )
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "coalesced": not created,
+        "status_url": f"/reports/fleet/{job.id}",
+    }
+
+
+@router.get("/fleet/{job_id}", summary="Progress (done / total / reports per second) and summary of a fleet report")
+def get_fleet_report(job_id: str, user=Depends(require_role("admin"))):
+    job = fleet_report_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Fleet report job not found")
+    return job.to_dict()
+
+
+@router.get("/fleet/{job_id}/download", summary="Zip of a finished fleet report (index, charts, per-equipment JSON)")
+def download_fleet_report(job_id: str, user=Depends(require_role("admin"))):
+    job = fleet_report_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Fleet report job not found")
+    if job.status != "completed":
+        raise HTTPException(status_code=409, detail=f"Fleet report is {job.status}")
+    archive = job.result["archive"]
+    if not os.path.exists(archive):
+        raise HTTPException(status_code=410, detail="Fleet report files were removed")
+    return FileResponse(archive, media_type="application/zip", filename=os.path.basename(archive))
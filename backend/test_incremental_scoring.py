@@ -0,0 +1,63 @@
+# test_incremental_scoring.py - A second incremental run on unchanged data re-scores nothing
+#
+#   python test_incremental_scoring.py
+#
+# Runs against a copy of the shipped database with the shipped models, whichever
+# engine (ensemble or rule-based fallback) they end up scoring with.
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+import batch_score
+import predict
+
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hospital_equipment_system.db")
+
+
+def copy_database(tmp):
+    path = os.path.join(tmp, "fleet.db")
+    shutil.copyfile(DB_PATH, path)
+    return path
+
+
+def test_predict_second_incremental_run_skips_unchanged():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = copy_database(tmp)
+        get_db = predict.get_db
+        predict.get_db = lambda: sqlite3.connect(db_path)
+        try:
+            first = predict.run_prediction("incremental")
+            second = predict.run_prediction("incremental")
+        finally:
+            predict.get_db = get_db
+
+    total = first["summary"]["total_equipment"]
+    assert first["summary"]["rescored"] == total, f"first run: {first['summary']}"
+    assert second["summary"]["rescored"] == 0, f"second run re-scored: {second['summary']}"
+    assert second["summary"]["skipped_unchanged"] == total, f"second run: {second['summary']}"
+    print(f"SUCCESS: /predict skipped all {total} unchanged equipment ({first['prediction_method']} engine)")
+
+
+def test_batch_second_incremental_run_skips_unchanged():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = copy_database(tmp)
+        first = batch_score.run_batch("incremental", db_path)
+        second = batch_score.run_batch("incremental", db_path)
+
+    total = first["summary"]["total_equipment"]
+    assert first["summary"]["rescored"] == total, f"first run: {first['summary']}"
+    assert second["summary"]["rescored"] == 0, f"second run re-scored: {second['summary']}"
+    assert second["summary"]["updated"] == 0, f"second run staged rows: {second['summary']}"
+    print(f"SUCCESS: batch_score skipped all {total} unchanged equipment ({first['prediction_method']} engine)")
+
+
+if __name__ == "__main__":
+    try:
+        test_predict_second_incremental_run_skips_unchanged()
+        test_batch_second_incremental_run_skips_unchanged()
+    except AssertionError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
@@ -0,0 +1,71 @@
+# test_prediction_reset.py - Post-maintenance prediction reset on an unmigrated database
+#
+#   python test_prediction_reset.py
+
+import os
+import sqlite3
+import sys
+import tempfile
+
+import maintenance
+
+# The tables as they exist before the priority cache columns and triggers were added
+LEGACY_SCHEMA = """
+CREATE TABLE equipment (equipment_id TEXT PRIMARY KEY, installation_date TEXT);
+CREATE TABLE maintenance_logs (
+    maintenance_id TEXT PRIMARY KEY, equipment_id TEXT, date TEXT, maintenance_type TEXT,
+    downtime_hours REAL, response_time_hours REAL, status TEXT
+);
+CREATE TABLE usage_logs (equipment_id TEXT, timestamp TEXT, usage_hours REAL);
+CREATE TABLE failure_predictions (
+    prediction_id INTEGER PRIMARY KEY AUTOINCREMENT, equipment_id TEXT, prediction_date TEXT,
+    needs_maintenance_10_days INTEGER, failure_probability REAL
+);
+CREATE TABLE maintenance_prediction_results (
+    equipment_id TEXT PRIMARY KEY, predicted_to_fail INTEGER, preventive TEXT,
+    corrective TEXT, replacement TEXT, last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+INSERT INTO equipment VALUES ('EQ001', '2020-01-01');
+INSERT INTO failure_predictions (equipment_id, prediction_date, needs_maintenance_10_days, failure_probability)
+VALUES ('EQ001', '2024-01-01', 1, 0.9);
+INSERT INTO maintenance_prediction_results (equipment_id, predicted_to_fail, preventive, corrective, replacement)
+VALUES ('EQ001', 1, 'High', 'High', 'Medium');
+"""
+
+
+def test_reset_on_unmigrated_database():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "legacy.db")
+        conn = sqlite3.connect(db_path)
+        conn.executescript(LEGACY_SCHEMA)
+        conn.close()
+
+        get_db = maintenance.get_db
+        maintenance.get_db = lambda: sqlite3.connect(db_path)
+        try:
+            maintenance.reset_equipment_health_predictions("EQ001")
+        finally:
+            maintenance.get_db = get_db
+
+        conn = sqlite3.connect(db_path)
+        mpr = conn.execute("""
+            SELECT predicted_to_fail, preventive, corrective, replacement, dirty
+            FROM maintenance_prediction_results WHERE equipment_id = 'EQ001'
+        """).fetchone()
+        fp = conn.execute("""
+            SELECT needs_maintenance_10_days, failure_probability
+            FROM failure_predictions WHERE equipment_id = 'EQ001'
+        """).fetchall()
+        conn.close()
+
+    assert mpr == (0, "Low", "Low", "Low", 0), f"priority result not reset: {mpr}"
+    assert fp == [(0, 0.1)], f"failure prediction not reset: {fp}"
+    print("SUCCESS: reset applied on a database without the dirty column")
+
+
+if __name__ == "__main__":
+    try:
+        test_reset_on_unmigrated_database()
+    except AssertionError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
@@ -0,0 +1,227 @@
+# backend/usage_rollups.py - usage_logs aggregates kept current by triggers
+#
+#   python usage_rollups.py            # rebuild the rollups from usage_logs
+#   python usage_rollups.py --check    # report rollups that drifted from usage_logs
+
+import argparse
+import sys
+
+import pandas as pd
+
+from database import get_db
+
+# MIN and MAX as separate subqueries: each is a single seek on idx_usage_logs_timestamp,
+# while MIN() and MAX() in one SELECT scan the table
+RANGE_QUERY = """
+    SELECT (SELECT MIN(timestamp) FROM usage_logs), (SELECT MAX(timestamp) FROM usage_logs)
+"""
+REBUILD_RANGE = """
+    INSERT OR REPLACE INTO usage_date_range (id, min_timestamp, max_timestamp)
+    SELECT 1, (SELECT MIN(timestamp) FROM usage_logs), (SELECT MAX(timestamp) FROM usage_logs)
+"""
+
+RANGE_TRIGGERS = {
+    # New rows can only widen the range
+    "trg_usage_date_range_insert": ("AFTER INSERT ON usage_logs WHEN NEW.timestamp IS NOT NULL", """
+        INSERT INTO usage_date_range (id, min_timestamp, max_timestamp)
+        VALUES (1, NEW.timestamp, NEW.timestamp)
+        ON CONFLICT(id) DO UPDATE SET
+            min_timestamp = min(COALESCE(min_timestamp, excluded.min_timestamp), excluded.min_timestamp),
+            max_timestamp = max(COALESCE(max_timestamp, excluded.max_timestamp), excluded.max_timestamp);
+    """),
+    # Removing or moving a row may shrink it; re-read both ends from the index
+    "trg_usage_date_range_delete": ("AFTER DELETE ON usage_logs", REBUILD_RANGE + ";"),
+    "trg_usage_date_range_update": ("AFTER UPDATE OF timestamp ON usage_logs", REBUILD_RANGE + ";"),
+}
+
+# usage_daily column -> usage_logs column it sums
+DAILY_SUMS = {
+    "usage_hours_sum": "usage_hours",
+    "cpu_temp_sum": "avg_cpu_temp",
+    "workload_sum": "workload_level",
+    "error_count_sum": "error_count",
+}
+
+
+def _clean(value):
+    """NULL and +/-inf count as 0 (9e999 is SQLite's infinity literal)"""
+    return f"(CASE WHEN {value} IS NULL OR abs({value}) >= 9e999 THEN 0 ELSE {value} END)"
+
+
+# Per equipment and day: row count and sums, so means are sum / log_count
+DAILY_AGGREGATE_QUERY = f"""
+    SELECT equipment_id, date(timestamp), COUNT(*),
+           {", ".join(f"SUM({_clean(src)})" for src in DAILY_SUMS.values())}
+    FROM usage_logs
+    WHERE date(timestamp) IS NOT NULL
+    GROUP BY equipment_id, date(timestamp)
+"""
+
+
+def _add_day(row, sign):
+    """Trigger statements adding (sign=+1) or removing (sign=-1) one log row's contribution"""
+    statement = f"""
+        INSERT INTO usage_daily (equipment_id, day, log_count, {", ".join(DAILY_SUMS)})
+        SELECT {row}.equipment_id, date({row}.timestamp), {sign},
+               {", ".join(f"{sign} * {_clean(f'{row}.{src}')}" for src in DAILY_SUMS.values())}
+        WHERE date({row}.timestamp) IS NOT NULL
+        ON CONFLICT(equipment_id, day) DO UPDATE SET
+            log_count = log_count + excluded.log_count,
+            {", ".join(f"{col} = {col} + excluded.{col}" for col in DAILY_SUMS)};
+    """
+    if sign < 0:
+        statement += f"""
+        DELETE FROM usage_daily
+        WHERE equipment_id = {row}.equipment_id AND day = date({row}.timestamp) AND log_count <= 0;
+        """
+    return statement
+
+
+DAILY_TRIGGERS = {
+    "trg_usage_daily_insert": ("AFTER INSERT ON usage_logs", _add_day("NEW", 1)),
+    "trg_usage_daily_delete": ("AFTER DELETE ON usage_logs", _add_day("OLD", -1)),
+    "trg_usage_daily_update": (
+        f"AFTER UPDATE OF equipment_id, timestamp, {', '.join(DAILY_SUMS.values())} ON usage_logs",
+        _add_day("OLD", -1) + _add_day("NEW", 1),
+    ),
+}
+
+_ready_databases = set()
+
+
+def _database_file(cursor):
+    cursor.execute("PRAGMA database_list")
+    return next(row[2] for row in cursor.fetchall() if row[1] == "main")
+
+
+def rebuild_usage_rollups(cursor):
+    """Recompute the rollups from usage_logs"""
+    cursor.execute(REBUILD_RANGE)
+    cursor.execute("DELETE FROM usage_daily")
+    cursor.execute(f"""
+        INSERT INTO usage_daily (equipment_id, day, log_count, {", ".join(DAILY_SUMS)})
+        {DAILY_AGGREGATE_QUERY}
+    """)
+
+
+def ensure_usage_rollups(cursor):
+    """
+    Create the rollup tables, their usage_logs triggers and idx_usage_logs_timestamp,
+    filling the tables on first use. Runs once per process and database file.
+    """
+    database = _database_file(cursor)
+    if database in _ready_databases:
+        return
+    cursor.execute("""
+        SELECT COUNT(*) FROM sqlite_master
+        WHERE type = 'table' AND name IN ('usage_date_range', 'usage_daily')
+    """)
+    created = cursor.fetchone()[0] < 2
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_usage_logs_timestamp ON usage_logs (timestamp)")
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS usage_date_range (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        min_timestamp TEXT,
+        max_timestamp TEXT
+    )
+    """)
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS usage_daily (
+        equipment_id TEXT,
+        day TEXT,
+        log_count INTEGER NOT NULL DEFAULT 0,
+        {", ".join(f"{col} REAL NOT NULL DEFAULT 0" for col in DAILY_SUMS)},
+        PRIMARY KEY (equipment_id, day)
+    )
+    """)
+    for name, (event, body) in {**RANGE_TRIGGERS, **DAILY_TRIGGERS}.items():
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body} END")
+    if created:
+        rebuild_usage_rollups(cursor)
+    cursor.connection.commit()
+    _ready_databases.add(database)
+
+
+def read_usage_date_range(cursor):
+    """(min_timestamp, max_timestamp) over all usage_logs, or (None, None) when empty"""
+    ensure_usage_rollups(cursor)
+    cursor.execute("SELECT min_timestamp, max_timestamp FROM usage_date_range WHERE id = 1")
+    row = cursor.fetchone()
+    return tuple(row) if row else (None, None)
+
+
+def read_usage_daily(conn, equipment_id, start_day=None, end_day=None):
+    """
+    Per-day usage for one equipment, sorted by date: mean usage hours, CPU temp and
+    workload over the day's log rows and summed errors (NULL/inf values count as 0).
+    Optional YYYY-MM-DD bounds are inclusive.
+    """
+    ensure_usage_rollups(conn.cursor())
+    query = """
+        SELECT day AS date,
+               usage_hours_sum / log_count AS usage_hours,
+               cpu_temp_sum / log_count AS avg_cpu_temp,
+               workload_sum / log_count AS workload_level,
+               error_count_sum AS error_count
+        FROM usage_daily
+        WHERE equipment_id = ?
+    """
+    params = [equipment_id]
+    if start_day is not None:
+        query += " AND day >= ?"
+        params.append(start_day)
+    if end_day is not None:
+        query += " AND day <= ?"
+        params.append(end_day)
+    daily = pd.read_sql(query + " ORDER BY day", conn, params=params)
+    daily["date"] = pd.to_datetime(daily["date"])
+    return daily
+
+
+def find_drift(cursor, tolerance=1e-6):
+    """Rollups whose stored values differ from a fresh aggregate over usage_logs"""
+    drifted = []
+    cursor.execute("SELECT min_timestamp, max_timestamp FROM usage_date_range WHERE id = 1")
+    stored = tuple(cursor.fetchone() or (None, None))
+    cursor.execute(RANGE_QUERY)
+    expected = tuple(cursor.fetchone())
+    if stored != expected:
+        drifted.append({"rollup": "usage_date_range", "stored": stored, "expected": expected})
+
+    cursor.execute(f"SELECT equipment_id, day, log_count, {', '.join(DAILY_SUMS)} FROM usage_daily")
+    stored = {row[:2]: row[2:] for row in cursor.fetchall()}
+    cursor.execute(DAILY_AGGREGATE_QUERY)
+    expected = {row[:2]: row[2:] for row in cursor.fetchall()}
+    empty = (0,) * (len(DAILY_SUMS) + 1)
+    for key in sorted(stored.keys() | expected.keys()):
+        have, want = stored.get(key, empty), expected.get(key, empty)
+        if any(abs(a - b) > tolerance for a, b in zip(have, want)):
+            drifted.append({"rollup": f"usage_daily {key[0]} {key[1]}", "stored": have, "expected": want})
+    return drifted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild or verify the usage_logs rollup tables")
+    parser.add_argument("--check", action="store_true", help="Only report drift, don't rebuild")
+    args = parser.parse_args()
+
+    conn = get_db()
+    try:
+        cursor = conn.cursor()
+        ensure_usage_rollups(cursor)
+        if args.check:
+            drifted = find_drift(cursor)
+            for row in drifted:
+                print(f"DRIFT: {row['rollup']} stored={row['stored']} expected={row['expected']}")
+            print(f"{len(drifted)} drifted rollups")
+            sys.exit(1 if drifted else 0)
+
+        rebuild_usage_rollups(cursor)
+        conn.commit()
+        print("SUCCESS: rebuilt usage rollups")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
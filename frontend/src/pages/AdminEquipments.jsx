@@ -88,19 +88,8 @@ export default function AdminEquipments() {
         console.warn("Prediction failed:", predErr);
       }
       
-      // Fetch priority data for each equipment - with error handling
-      const equipmentsList = resEquip.data.equipments || [];
-      await Promise.allSettled(equipmentsList.map(async ([id]) => {
-        try {
-          await api.get(`/maintenance-log/priority/${id}`, { 
-            headers: { Authorization: `Bearer ${token}` } 
-          });
-        } catch (err) {
-          console.warn(`Failed to fetch priority for equipment ${id}:`, err);
-        }
-      }));
-
       // Fetch health badges and scheduled map
+      const equipmentsList = resEquip.data.equipments || [];
       await fetchHealthBadges(equipmentsList);
       await fetchScheduledMap(equipmentsList);
       await fetchPendingReviews();
@@ -113,31 +102,36 @@ export default function AdminEquipments() {
   const fetchHealthBadges = async (equipmentsList) => {
     const map = {};
     
-    await Promise.allSettled(equipmentsList.map(async ([id]) => {
-      try {
-        const res = await api.get(`/maintenance-log/priority/${id}`, { 
-          headers: { Authorization: `Bearer ${token}` } 
-        });
-        
-        const { predicted_to_fail, maintenance_needs } = res.data;
-        console.log(`Health data for ${id}:`, { predicted_to_fail, maintenance_needs });
-        
-        const isRisk = predicted_to_fail || Object.values(maintenance_needs || {}).includes('High');
-        
-        map[id] = isRisk ? {
-          label: 'High Risk',
-          msg: `${predicted_to_fail ? 'Predicted to Fail' : ''}${predicted_to_fail && maintenance_needs ? ', ' : ''}${Object.entries(maintenance_needs || {}).filter(([_, v]) => v === 'High').map(([k]) => k.charAt(0).toUpperCase() + k.slice(1)).join(', ')} maintenance`
-        } : { 
-          label: 'Healthy', 
-          msg: '' 
-        };
-        
-      } catch (err) {
-        console.error(`Error fetching health for ${id}:`, err);
+    // One request for the whole fleet; the browser revalidates it with its ETag
+    let priorities = {};
+    try {
+      const res = await api.get('/maintenance-log/priority', { 
+        headers: { Authorization: `Bearer ${token}` } 
+      });
+      priorities = Object.fromEntries((res.data.priorities || []).map((p) => [p.equipment_id, p]));
+    } catch (err) {
+      console.error('Error fetching fleet priorities:', err);
+    }
+
+    equipmentsList.forEach(([id]) => {
+      const priority = priorities[id];
+      if (!priority) {
         map[id] = { label: 'Unknown', msg: 'Error loading health status' };
+        return;
       }
-    }));
-    
+
+      const { predicted_to_fail, maintenance_needs } = priority;
+      const isRisk = predicted_to_fail || Object.values(maintenance_needs || {}).includes('High');
+      
+      map[id] = isRisk ? {
+        label: 'High Risk',
+        msg: `${predicted_to_fail ? 'Predicted to Fail' : ''}${predicted_to_fail && maintenance_needs ? ', ' : ''}${Object.entries(maintenance_needs || {}).filter(([_, v]) => v === 'High').map(([k]) => k.charAt(0).toUpperCase() + k.slice(1)).join(', ')} maintenance`
+      } : { 
+        label: 'Healthy', 
+        msg: '' 
+      };
+    });
+
     console.log('Complete health map:', map);
     setHealthMap(map);
   };
@@ -109,28 +109,14 @@ export default function BiomedicalEquipments() {
         console.warn("Cannot fetch EDA image:", edaErr);
       }
 
-      // Run predictions - but don't let this affect other data
-      try {
-        await api.post('/predict', {}, { 
-          headers: { Authorization: `Bearer ${token}` } 
-        });
-      } catch (predErr) {
-        console.warn("Prediction failed:", predErr);
-      }
+      // Predictions are refreshed by the server-side scheduler; just nudge a
+      // background run (coalesced with any in progress) without waiting for it
+      api.post('/predict/jobs', {}, { 
+        headers: { Authorization: `Bearer ${token}` } 
+      }).catch((predErr) => console.warn("Prediction failed:", predErr));
       
-      // Fetch priority data for each equipment - with error handling
-      const equipmentsList = resEquip.data.equipments || [];
-      await Promise.allSettled(equipmentsList.map(async ([id]) => {
-        try {
-          await api.get(`/maintenance-log/priority/${id}`, { 
-            headers: { Authorization: `Bearer ${token}` } 
-          });
-        } catch (err) {
-          console.warn(`Failed to fetch priority for equipment ${id}:`, err);
-        }
-      }));
-
       // Fetch health badges and scheduled map
+      const equipmentsList = resEquip.data.equipments || [];
       await fetchHealthBadges(equipmentsList);
       await fetchScheduledMap(equipmentsList);
       
@@ -142,21 +128,29 @@ export default function BiomedicalEquipments() {
 
   const fetchHealthBadges = async (equipmentsList) => {
     const map = {};
-    await Promise.all(equipmentsList.map(async ([id]) => {
-      try {
-        const res = await api.get(`/maintenance-log/priority/${id}`, { 
-          headers: { Authorization: `Bearer ${token}` } 
-        });
-        const { predicted_to_fail, maintenance_needs } = res.data;
-        const isRisk = predicted_to_fail || Object.values(maintenance_needs).includes('High');
-        map[id] = isRisk ? {
-          label: 'High Risk',
-          msg: `${predicted_to_fail ? 'Predicted to Fail' : ''}${predicted_to_fail && maintenance_needs ? ', ' : ''}${Object.entries(maintenance_needs).filter(([_, v]) => v === 'High').map(([k]) => k.charAt(0).toUpperCase() + k.slice(1)).join(', ')} maintenance`
-        } : { label: 'Healthy', msg: '' };
-      } catch {
+    // One request for the whole fleet; the browser revalidates it with its ETag
+    let priorities = {};
+    try {
+      const res = await api.get('/maintenance-log/priority', { 
+        headers: { Authorization: `Bearer ${token}` } 
+      });
+      priorities = Object.fromEntries((res.data.priorities || []).map((p) => [p.equipment_id, p]));
+    } catch (err) {
+      console.warn('Failed to fetch fleet priorities:', err);
+    }
+    equipmentsList.forEach(([id]) => {
+      const priority = priorities[id];
+      if (!priority) {
         map[id] = { label: 'Unknown', msg: '' };
+        return;
       }
-    }));
+      const { predicted_to_fail, maintenance_needs } = priority;
+      const isRisk = predicted_to_fail || Object.values(maintenance_needs).includes('High');
+      map[id] = isRisk ? {
+        label: 'High Risk',
+        msg: `${predicted_to_fail ? 'Predicted to Fail' : ''}${predicted_to_fail && maintenance_needs ? ', ' : ''}${Object.entries(maintenance_needs).filter(([_, v]) => v === 'High').map(([k]) => k.charAt(0).toUpperCase() + k.slice(1)).join(', ')} maintenance`
+      } : { label: 'Healthy', msg: '' };
+    });
     setHealthMap(map);
   };
 
@@ -106,7 +106,9 @@ export default function TechnicianEquipments() {
       console.log('Available keys in profile:', Object.keys(resProfile.data || {}));
       setProfile(resProfile.data || {});
 
-      await api.post('/predict', {}, { headers: { Authorization: `Bearer ${token}` } });
+      // Server-side scheduler keeps predictions fresh; queue a background run without waiting
+      api.post('/predict/jobs', {}, { headers: { Authorization: `Bearer ${token}` } })
+        .catch((predErr) => console.warn('Prediction failed:', predErr));
 
       await fetchHealthBadges(resEquip.data.equipments);
     } catch (err) {
@@ -121,23 +123,31 @@ export default function TechnicianEquipments() {
 
   const fetchHealthBadges = async (equipmentsList) => {
     const map = {};
-    await Promise.all(equipmentsList.map(async ([id]) => {
-      try {
-        const res = await api.get(`/maintenance-log/priority/${id}`, {
-          headers: { Authorization: `Bearer ${token}` },
-        });
-        const { predicted_to_fail, maintenance_needs } = res.data;
-        const isRisk = predicted_to_fail || Object.values(maintenance_needs).includes('High');
-        map[id] = isRisk
-          ? {
-              label: 'High Risk',
-              msg: `${predicted_to_fail ? 'Predicted to Fail' : ''}${predicted_to_fail && maintenance_needs ? ', ' : ''}${Object.entries(maintenance_needs).filter(([_, v]) => v === 'High').map(([k]) => k.charAt(0).toUpperCase() + k.slice(1)).join(', ')} maintenance`
-            }
-          : { label: 'Healthy', msg: '' };
-      } catch {
+    // One request for all visible equipment; the browser revalidates it with its ETag
+    let priorities = {};
+    try {
+      const res = await api.get('/maintenance-log/priority', {
+        headers: { Authorization: `Bearer ${token}` },
+      });
+      priorities = Object.fromEntries((res.data.priorities || []).map((p) => [p.equipment_id, p]));
+    } catch (err) {
+      console.warn('Failed to fetch fleet priorities:', err);
+    }
+    equipmentsList.forEach(([id]) => {
+      const priority = priorities[id];
+      if (!priority) {
         map[id] = { label: 'Unknown', msg: '' };
+        return;
       }
-    }));
+      const { predicted_to_fail, maintenance_needs } = priority;
+      const isRisk = predicted_to_fail || Object.values(maintenance_needs).includes('High');
+      map[id] = isRisk
+        ? {
+            label: 'High Risk',
+            msg: `${predicted_to_fail ? 'Predicted to Fail' : ''}${predicted_to_fail && maintenance_needs ? ', ' : ''}${Object.entries(maintenance_needs).filter(([_, v]) => v === 'High').map(([k]) => k.charAt(0).toUpperCase() + k.slice(1)).join(', ')} maintenance`
+          }
+        : { label: 'Healthy', msg: '' };
+    });
     setHealthMap(map);
   };
 